@@ -0,0 +1,197 @@
+"""
+Envío de métricas y estado al backend.
+Una sola sesión HTTP (keep-alive) durante toda la vida del bot; las métricas
+se encolan en memoria y se envían por lotes con reintentos y backoff, de modo
+que un backend lento o caído nunca bloquea el loop de métricas.
+"""
+
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import aiohttp
+
+from bot.config.settings import Settings
+
+
+class BackendReporter:
+    """Cliente del backend con cola acotada de métricas y envío por lotes."""
+
+    def __init__(self, url: str, api_key: str,
+                 max_cola: int = Settings.BACKEND_QUEUE_MAXSIZE,
+                 tamano_lote: int = Settings.BACKEND_BATCH_SIZE,
+                 intervalo: float = Settings.BACKEND_FLUSH_INTERVAL,
+                 timeout: float = Settings.BACKEND_TIMEOUT,
+                 max_backoff: float = Settings.BACKEND_MAX_BACKOFF):
+        self.url = (url or "").rstrip("/")
+        self.api_key = api_key
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        # Al llenarse se descarta la muestra más antigua (cubre ~1 día a 1 muestra/min)
+        self._cola: Deque[Dict[str, Any]] = deque(maxlen=max_cola)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._hay_datos = asyncio.Event()
+        self._fallos_seguidos = 0
+        # Durante un backoff no se reintenta antes de este instante (reloj del loop)
+        self._reintentar_desde = 0.0
+        self.enviadas = 0
+        self.descartadas = 0
+
+    @property
+    def configurado(self) -> bool:
+        return bool(self.url and self.api_key)
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._cola)
+
+    async def iniciar(self) -> None:
+        """Abre la sesión compartida e inicia el envío en segundo plano."""
+        if not self.configurado or self._session is not None:
+            return
+        self._session = aiohttp.ClientSession(
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=120)
+        )
+        self._tarea = asyncio.create_task(self._bucle_envio())
+
+    def encolar(self, payload: Dict[str, Any]) -> None:
+        """Agrega una muestra a la cola sin esperar a la red."""
+        if not self.configurado:
+            return
+        if len(self._cola) == self._cola.maxlen:
+            self.descartadas += 1
+        self._cola.append(payload)
+        if len(self._cola) >= self.tamano_lote and not self._en_backoff():
+            self._hay_datos.set()
+
+    def _en_backoff(self) -> bool:
+        return asyncio.get_running_loop().time() < self._reintentar_desde
+
+    async def _post(self, ruta: str, payload: Dict[str, Any]) -> bool:
+        try:
+            async with self._session.post(f"{self.url}{ruta}", json=payload) as response:
+                if response.status == 200:
+                    return True
+                logging.error(f"Error del backend en {ruta}: {response.status} - {await response.text()}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"No se pudo conectar al backend ({ruta}): {e}")
+        return False
+
+    def _reencolar(self, pendientes: List[Dict[str, Any]]) -> None:
+        """Devuelve muestras al frente de la cola en orden (se pierden primero las más antiguas)."""
+        for i, restante in enumerate(reversed(pendientes)):
+            if len(self._cola) == self._cola.maxlen:
+                self.descartadas += len(pendientes) - i
+                return
+            self._cola.appendleft(restante)
+
+    async def _enviar_lote(self) -> bool:
+        """Envía hasta un lote de la cola; lo no enviado vuelve al frente en orden."""
+        lote: List[Dict[str, Any]] = []
+        while self._cola and len(lote) < self.tamano_lote:
+            lote.append(self._cola.popleft())
+
+        i = 0
+        try:
+            for i, payload in enumerate(lote):
+                if not await self._post("/metrics/", payload):
+                    self._reencolar(lote[i:])
+                    return False
+                self.enviadas += 1
+        except asyncio.CancelledError:
+            # Cierre en pleno envío: el lote vuelve a la cola para que cerrar() lo vacíe
+            self._reencolar(lote[i:])
+            raise
+        except Exception:
+            # La muestra que provocó el error se descarta para no reintentarla sin fin
+            self.descartadas += 1
+            self._reencolar(lote[i + 1:])
+            raise
+        return True
+
+    def _backoff(self) -> float:
+        base = min(self.max_backoff, self.intervalo * (2 ** self._fallos_seguidos))
+        return base * random.uniform(0.5, 1.0)
+
+    async def _bucle_envio(self) -> None:
+        espera = self.intervalo
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._hay_datos.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+            self._hay_datos.clear()
+            # Un lote lleno no adelanta el reintento: se respeta el backoff completo
+            restante = self._reintentar_desde - loop.time()
+            if restante > 0:
+                espera = restante
+                continue
+
+            enviadas_antes = self.enviadas
+            ok = True
+            try:
+                while self._cola and ok:
+                    ok = await self._enviar_lote()
+            except Exception:
+                logging.exception("❌ Error inesperado enviando métricas al backend.")
+                ok = False
+
+            if ok:
+                if self.enviadas > enviadas_antes:
+                    logging.info(f"Métricas enviadas exitosamente al backend ({self.enviadas - enviadas_antes} muestras).")
+                self._fallos_seguidos = 0
+                self._reintentar_desde = 0.0
+                espera = self.intervalo
+            else:
+                self._fallos_seguidos += 1
+                espera = self._backoff()
+                self._reintentar_desde = loop.time() + espera
+                logging.warning(
+                    f"⚠️ Backend no disponible; {len(self._cola)} muestras en cola, reintento en {espera:.0f}s."
+                )
+
+    async def actualizar_estado(self, status: str) -> None:
+        """Envía una actualización de estado al backend (fuera de la cola)."""
+        if not self.configurado:
+            return
+        if self._session is None:
+            await self.iniciar()
+        if await self._post("/status/", {"status": status}):
+            logging.info(f"Estado del bot actualizado a '{status}' en el backend.")
+
+    async def cerrar(self, timeout: float = 5.0) -> None:
+        """Intenta vaciar la cola, detiene el envío y cierra la sesión."""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+        if self._session is not None:
+            try:
+                await asyncio.wait_for(self._vaciar(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            except Exception:
+                logging.exception("❌ Error vaciando la cola de métricas al cerrar.")
+            if self._cola:
+                logging.warning(f"⚠️ {len(self._cola)} muestras de métricas no se enviaron antes de cerrar.")
+            await self._session.close()
+            self._session = None
+
+    async def _vaciar(self) -> None:
+        while self._cola and await self._enviar_lote():
+            pass
@@ -1,16 +1,22 @@
 import os
 import discord
 from discord.ext import commands, tasks
-import aiohttp
 from dotenv import load_dotenv
-# from database import init_db_pool, close_db_pool
 import asyncio
 import logging
 import datetime
+import hashlib
+import json
+import time
 from zoneinfo import ZoneInfo
 from aiohttp import web
 import database as db
+from backend_reporter import BackendReporter
+from bot.core.metrics import metrics, exportar_prometheus
+from bot.core.database.instrumentation import consultas
 from utils import LIMA_TZ, format_timedelta, format_timedelta_total, es_domingo
+from bot.config.settings import Settings
+from bot.config.constants import HORARIO_ENTRADA_INICIO
 
 # Cargar variables de entorno
 load_dotenv()
@@ -33,26 +39,6 @@ logging.basicConfig(
 # Configurar logging para usar hora de Lima
 logging.Formatter.converter = lambda *args: datetime.datetime.now(LIMA_TZ).timetuple()
 
-# Clase para métricas del bot
-class BotMetrics:
-    def __init__(self):
-        self.start_time = datetime.datetime.now(datetime.timezone.utc)
-        self.events_processed_today = 0
-        self.last_reset_day = self.start_time.day
-
-    def increment_event_count(self):
-        """Incrementa el contador de eventos y lo resetea si es un nuevo día."""
-        now = datetime.datetime.now(datetime.timezone.utc)
-        if now.day != self.last_reset_day:
-            self.events_processed_today = 0
-            self.last_reset_day = now.day
-        self.events_processed_today += 1
-
-    def get_uptime(self):
-        """Calcula el tiempo de actividad del bot."""
-        return datetime.datetime.now(datetime.timezone.utc) - self.start_time
-
-metrics = BotMetrics()
 
 intents = discord.Intents.default()
 intents.messages = True
@@ -82,23 +68,13 @@ bot.roles_recuperacion = {
     # Ejemplo con roles: 1389959112556679239: [123456789012345678, 987654321098765432]
 }
 
+# Cliente del backend: una sesión HTTP compartida durante toda la vida del bot
+reporter = BackendReporter(BACKEND_URL, BACKEND_API_KEY)
+
 # Función para actualizar el estado del bot en el backend
 async def update_bot_status(status: str):
     """Envía una actualización de estado al backend."""
-    if not BACKEND_URL or not BACKEND_API_KEY:
-        return  # Skip if backend not configured
-    
-    headers = {"Authorization": f"Bearer {BACKEND_API_KEY}"}
-    payload = {"status": status}
-    async with aiohttp.ClientSession(headers=headers) as session:
-        try:
-            async with session.post(f"{BACKEND_URL}/status/", json=payload) as response:
-                if response.status == 200:
-                    logging.info(f"Estado del bot actualizado a '{status}' en el backend.")
-                else:
-                    logging.error(f"Error al actualizar el estado del bot: {response.status}")
-        except aiohttp.ClientConnectorError as e:
-            logging.error(f"No se pudo conectar al backend para actualizar estado: {e}")
+    await reporter.actualizar_estado(status)
 
 # Eventos para Contar Métricas
 @bot.event
@@ -111,13 +87,43 @@ async def on_message(message: discord.Message):
 @bot.event
 async def on_interaction(interaction: discord.Interaction):
     metrics.increment_event_count()
+    # Demora entre que Discord recibe la interacción y llega al bot
+    metrics.registrar_recepcion((discord.utils.utcnow() - interaction.created_at).total_seconds())
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    # Desde la recepción de la interacción hasta terminar el comando (defer + followup)
+    segundos = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    metrics.registrar_comando(command.qualified_name, segundos)
+
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
+    segundos = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    nombre = interaction.command.qualified_name if interaction.command else 'desconocido'
+    metrics.registrar_comando(nombre, segundos, error=True)
+    logging.error(f"Error en el comando '{nombre}': {error}", exc_info=error)
+
+# Uptime real: tiempo conectado al gateway
+@bot.event
+async def on_connect():
+    metrics.marcar_conectado()
+
+@bot.event
+async def on_resumed():
+    metrics.marcar_conectado()
+
+@bot.event
+async def on_disconnect():
+    metrics.marcar_desconectado()
 
 # Tarea Periódica para Enviar Métricas
 @tasks.loop(minutes=1)
 async def send_metrics_to_backend():
+    await bot.wait_until_ready()
+    # La latencia del gateway alimenta /metrics aunque no haya backend configurado
+    metrics.registrar_gateway(bot.latency)
     if not BACKEND_URL or not BACKEND_API_KEY:
         return  # Skip if backend not configured
-    await bot.wait_until_ready()
     
     uptime_delta = metrics.get_uptime()
     now_lima = datetime.datetime.now()
@@ -126,7 +132,7 @@ async def send_metrics_to_backend():
         "resumen": {
             "servidores_conectados": len(bot.guilds),
             "eventos_procesados_hoy": metrics.events_processed_today,
-            "uptime_porcentaje": 99.9,
+            "uptime_porcentaje": metrics.uptime_porcentaje(),
             "ultima_sincronizacion": now_lima.isoformat()
         },
         "estado": {
@@ -143,74 +149,127 @@ async def send_metrics_to_backend():
                 "canales": len(guild.channels),
                 "status": "conectado"
             } for guild in bot.guilds
-        ]
+        ],
+        # Latencias p50/p95/p99 de comandos, BD, Sheets y gateway
+        "rendimiento": {**metrics.resumen(), "consultas_top": consultas.top(10)}
     }
 
-    headers = {
-        "Authorization": f"Bearer {BACKEND_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    # Se encola sin esperar a la red; el reporter envía por lotes en segundo plano
+    reporter.encolar(payload)
+
+# Servidores donde los comandos se copian y sincronizan para que aparezcan al instante
+GUILDS_SYNC = [1389959112556679239, 1405602519635202048]
+
+EXTENSIONES = [
+    'cogs.asistencia.commands',
+    'cogs.test.commands',
+    'cogs.admin.commands',
+    # 'cogs.faltas.commands',
+]
+
+def hash_arbol_comandos(tree: discord.app_commands.CommandTree) -> str:
+    """Hash estable del árbol de comandos globales y de los servidores a sincronizar."""
+    comandos = sorted(
+        (cmd.to_dict(tree) for cmd in tree.get_commands()),
+        key=lambda c: (c.get('type', 1), c['name'])
+    )
+    contenido = json.dumps({"comandos": comandos, "guilds": GUILDS_SYNC}, sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+async def sincronizar_arbol_comandos():
+    """Sincroniza el árbol con Discord solo si cambió desde la última sincronización."""
+    inicio = time.perf_counter()
+    clave = f"arbol_comandos:{bot.application_id}"
+    hash_actual = hash_arbol_comandos(bot.tree)
 
-    async with aiohttp.ClientSession(headers=headers) as session:
-        try:
-            async with session.post(f"{BACKEND_URL}/metrics/", json=payload) as response:
-                if response.status == 200:
-                    logging.info("Métricas enviadas exitosamente al backend.")
-                else:
-                    logging.error(f"Error al enviar métricas: {response.status} - {await response.text()}")
-        except aiohttp.ClientConnectorError as e:
-            logging.error(f"No se pudo conectar al backend para enviar métricas: {e}")
-        except Exception as e:
-            logging.error(f"Ocurrió un error inesperado al enviar métricas: {e}")
+    try:
+        hash_guardado = await db.obtener_estado_bot(clave)
+    except RuntimeError as e:
+        logging.warning(f"⚠️ No se pudo leer el hash del árbol de comandos: {e}")
+        hash_guardado = None
+
+    if hash_guardado == hash_actual:
+        logging.info('⏭️ Árbol de comandos sin cambios, se omite la sincronización.')
+        return
+
+    logging.info('Sincronizando comandos...')
+    try:
+        # Sincronización global
+        synced = await bot.tree.sync()
+        logging.info(f'✅ {len(synced)} comandos sincronizados globalmente.')
+        logging.info(f"Comandos cargados: {', '.join(cmd.name for cmd in synced)}")
+
+        # Sincronización por servidor para que los comandos aparezcan al instante
+        guilds = [discord.Object(id=guild_id) for guild_id in GUILDS_SYNC]
+        resultados = await asyncio.gather(*(bot.tree.sync(guild=guild) for guild in guilds))
+        for guild, synced_guild in zip(guilds, resultados):
+            logging.info(f'✅ {len(synced_guild)} comandos sincronizados en servidor {guild.id}.')
+
+        await db.guardar_estado_bot(clave, hash_actual)
+    except Exception as e:
+        logging.error(f"❌ Error sincronizando comandos: {e}")
+        return
+
+    logging.info(f'⏱️ Sincronización de comandos completada en {time.perf_counter() - inicio:.2f}s.')
 
 # Evento de inicio del bot
 @bot.event
 async def setup_hook():
-    import database as db
-    logging.info('Verificando y configurando base de datos...')
-    await db.ensure_db_setup()
-    
+    import utils
+    tiempos = {}
+
+    async def fase(nombre, coro):
+        inicio = time.perf_counter()
+        resultado = await coro
+        tiempos[nombre] = time.perf_counter() - inicio
+        return resultado
+
+    async def preparar_base_datos():
+        logging.info('Verificando y configurando base de datos...')
+        await fase('base_datos', db.ensure_db_setup())
+        indice = await fase('config_servidores', utils.recargar_config_servidores(bot))
+        logging.info(f'Configuración de canales cargada ({len(indice.configs)} servidores en BD).')
+
+    async def cargar_extension(nombre):
+        # Ajuste: Cargar explícitamente .commands ya que no usamos __init__.py en las subcarpetas
+        await fase(nombre, bot.load_extension(nombre))
+        logging.info(f'...{nombre} cargada')
+
+    # La base de datos y las extensiones no dependen entre sí
+    inicio = time.perf_counter()
     logging.info('Cargando extensiones...')
-    # Ajuste: Cargar explícitamente .commands ya que no usamos __init__.py en las subcarpetas
-    await bot.load_extension('cogs.asistencia.commands')
-    logging.info('...Asistencia cargada')
-    
-    # await bot.load_extension('cogs.faltas.commands') 
-    
-    await bot.load_extension('cogs.test.commands')
-    logging.info('...Módulo Test cargado')
-    
-    await bot.load_extension('cogs.admin.commands')
-    logging.info('...Admin cargada')
-    
-    logging.info('Sincronizando comandos...')
-    
-    # Sincronización global
-    synced = await bot.tree.sync()
-    logging.info(f'✅ {len(synced)} comandos sincronizados globalmente.')
-    
-    # Imprimir qué comandos se cargaron para debug
-    cmds = [cmd.name for cmd in synced]
-    logging.info(f"Comandos cargados: {', '.join(cmds)}")
-
-    # Forzar sincronización por servidor para que los comandos aparezcan al instante
-    for guild_id in [1389959112556679239, 1405602519635202048]:
-        guild = discord.Object(id=guild_id)
-        bot.tree.copy_global_to(guild=guild)
-        synced_guild = await bot.tree.sync(guild=guild)
-        logging.info(f'✅ {len(synced_guild)} comandos sincronizados en servidor {guild_id}.')
-    
+    await asyncio.gather(preparar_base_datos(), *(cargar_extension(ext) for ext in EXTENSIONES))
+    tiempos['total'] = time.perf_counter() - inicio
+
+    for guild_id in GUILDS_SYNC:
+        bot.tree.copy_global_to(guild=discord.Object(id=guild_id))
+
+    # La sincronización del árbol (HTTP con rate limit) no bloquea el arranque
+    bot.tarea_sync_arbol = asyncio.create_task(sincronizar_arbol_comandos())
+
+    detalle = ', '.join(f'{nombre}={segundos:.2f}s' for nombre, segundos in tiempos.items())
+    logging.info(f'⏱️ Tiempos de arranque: {detalle}')
+
     # Iniciar sincronización con Google Sheets (si está configurada)
-    from google_sheets import sync_practicantes_to_db, export_report_to_sheet
+    from google_sheets import sync_practicantes_to_db, exportar_cambios_pendientes
     
-    # Tarea de sincronización
+    # Tarea de sincronización de practicantes (Sheets -> BD). Corre a toda hora para que
+    # los registros nocturnos ya estén al abrir la entrada (sin cambios es un solo modifiedTime)
     @tasks.loop(minutes=10)
     async def sync_google_sheets_task():
         await bot.wait_until_ready()
         logging.info("↻ Iniciando sincronización periódica con Google Sheets...")
-        from google_sheets import sync_practicantes_to_db, export_report_to_sheet
         await sync_practicantes_to_db()
-        await export_report_to_sheet()
+
+    # Reportes (BD -> Sheets): solo cuando entrada/salida/recuperación/edición marcaron cambios.
+    # Las validaciones Anti-Farming se sondean únicamente en horario laboral
+    @tasks.loop(seconds=15)
+    async def reportes_sheets_task():
+        await bot.wait_until_ready()
+        await exportar_cambios_pendientes(sondear_anti_farming=utils.en_horario_laboral())
+
+    # Un primer export tras el arranque deja las hojas al día con la BD
+    utils.marcar_cambio_asistencia()
 
     # Tarea de Reporte Diario Automático
     @tasks.loop(minutes=15)
@@ -283,13 +342,44 @@ async def setup_hook():
         await db.execute_query("INSERT INTO reportes_enviados (fecha) VALUES (%s)", (fecha_hoy,))
         logging.info(f"✅ Reporte diario del {fecha_hoy} enviado correctamente.")
 
+    # Calentamiento del pool antes de que abra la ventana de entrada (7:50)
+    apertura = datetime.datetime.combine(datetime.date.today(), HORARIO_ENTRADA_INICIO)
+    hora_calentamiento = (apertura - datetime.timedelta(minutes=Settings.DB_POOL_WARMUP_MINUTES)).time()
+
+    @tasks.loop(time=hora_calentamiento.replace(tzinfo=LIMA_TZ))
+    async def calentar_pool_task():
+        if es_domingo():
+            return
+        try:
+            listas = await db.calentar_pool()
+            logging.info(f"🔥 Pool de BD calentado: {listas} conexiones listas antes de la entrada.")
+        except Exception as e:
+            logging.error(f"❌ Error calentando el pool de BD: {e}")
+        # Practicantes registrados durante la noche, antes del pico de entradas
+        try:
+            await sync_practicantes_to_db()
+        except Exception as e:
+            logging.error(f"❌ Error sincronizando practicantes antes de la entrada: {e}")
+
+    # Refresco periódico del caché de configuración de servidores
+    @tasks.loop(minutes=5)
+    async def refrescar_config_servidores_task():
+        try:
+            await utils.recargar_config_servidores(bot)
+        except Exception as e:
+            logging.error(f"❌ Error refrescando configuración de servidores: {e}")
+
     # Iniciar las tareas
     sync_google_sheets_task.start()
+    reportes_sheets_task.start()
+    refrescar_config_servidores_task.start()
+    calentar_pool_task.start()
     auto_reporte_diario_task.start()
     logging.info('Tareas programadas iniciadas.')
 
     # Nota: Los cogs ahora están organizados en carpetas (asistencia/, faltas/, recuperacion/)
     logging.info('Iniciando tarea de envío de métricas...')
+    await reporter.iniciar()
     send_metrics_to_backend.start()
     logging.info(f'Bot logueado como {bot.user} (Configurando conexión...)')
 
@@ -303,9 +393,26 @@ async def on_ready():
 async def health_check_handler(request):
     return web.Response(text="Bot is running!", status=200)
 
+async def metrics_handler(request):
+    """Métricas en formato de texto de Prometheus."""
+    texto = exportar_prometheus(metrics, db.estado_pool())
+    return web.Response(body=texto.encode("utf-8"), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+async def ready_handler(request):
+    """Listo solo si el pool de la BD entrega una conexión viva."""
+    db_ok = await db.ping_pool()
+    cuerpo = {
+        "database": "ok" if db_ok else "error",
+        "discord": "ok" if bot.is_ready() else "connecting",
+        "pool": db.estado_pool(),
+    }
+    return web.json_response(cuerpo, status=200 if db_ok else 503)
+
 async def start_health_check():
     app = web.Application()
     app.router.add_get("/", health_check_handler)
+    app.router.add_get("/metrics", metrics_handler)
+    app.router.add_get("/ready", ready_handler)
     runner = web.AppRunner(app)
     await runner.setup()
     # Usar el puerto que asigne el hosting o el 10000 por defecto
@@ -335,9 +442,9 @@ async def main():
         if send_metrics_to_backend.is_running():
             send_metrics_to_backend.cancel()
         await update_bot_status("offline")
-        await asyncio.sleep(1)
-        # await close_db_pool()
-        # logging.info("Conexión a la base de datos cerrada.")
+        await reporter.cerrar()
+        await db.close_db_pool()
+        logging.info("Conexión a la base de datos cerrada.")
         await bot.close()
 
 if __name__ == "__main__":
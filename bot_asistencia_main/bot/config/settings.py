@@ -22,7 +22,10 @@ class Settings:
     DB_USER: str = os.getenv("DB_USER", "root")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
     DB_NAME: str = os.getenv("DB_NAME", "bot_db")
-    DB_PORT: int = int(os.getenv("DB_PORT", "3306"))
+    DB_PORT: int = int(os.getenv("DB_PORT", "3306"))  # MySQL usa 3306, TiDB usa 4000
+    # TiDB Cloud requiere TLS
+    DB_USE_SSL: bool = os.getenv("DB_USE_SSL") == "True"
+    DB_SSL_CA: str = os.getenv("SSL_CA_PATH", "isrgrootx1.pem")
     
     # Backend API
     BACKEND_API_KEY: str = os.getenv("BACKEND_API_KEY", "")
@@ -45,9 +48,47 @@ class Settings:
     }
     
     # Pool de conexiones
-    DB_POOL_MINSIZE: int = 1
-    DB_POOL_MAXSIZE: int = 10
-    
+    DB_POOL_MINSIZE: int = int(os.getenv("DB_POOL_MINSIZE", "2"))
+    DB_POOL_MAXSIZE: int = int(os.getenv("DB_POOL_MAXSIZE", "10"))
+    # Segundos tras los cuales una conexión se recicla (TiDB Cloud corta las conexiones TLS ociosas)
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "600"))
+    # Conexiones ociosas por más de estos segundos se verifican con ping antes de usarse
+    DB_POOL_PING_IDLE: float = float(os.getenv("DB_POOL_PING_IDLE", "30"))
+    # Calentamiento del pool antes de la ventana de entrada (conexiones y minutos de antelación)
+    DB_POOL_WARMUP_CONNECTIONS: int = int(os.getenv("DB_POOL_WARMUP_CONNECTIONS", "4"))
+    DB_POOL_WARMUP_MINUTES: int = int(os.getenv("DB_POOL_WARMUP_MINUTES", "5"))
+
+    # Instrumentación de consultas: umbral de consulta lenta (ms) y fracción muestreada (0-1)
+    DB_SLOW_QUERY_MS: float = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+    DB_QUERY_SAMPLE_RATE: float = float(os.getenv("DB_QUERY_SAMPLE_RATE", "1.0"))
+
+    # Tamaño de lote para inserciones masivas (sync con Sheets)
+    DB_BULK_CHUNK_SIZE: int = int(os.getenv("DB_BULK_CHUNK_SIZE", "500"))
+
+    # Google Sheets (pool de hilos dedicado y timeout por llamada, en segundos)
+    SHEETS_MAX_WORKERS: int = int(os.getenv("SHEETS_MAX_WORKERS", "2"))
+    SHEETS_CALL_TIMEOUT: float = float(os.getenv("SHEETS_CALL_TIMEOUT", "30"))
+
+    # Export a Sheets por cambios: espera sin marcas nuevas (debounce) y antigüedad máxima de un cambio (segundos)
+    SHEETS_DEBOUNCE: int = int(os.getenv("SHEETS_DEBOUNCE", "30"))
+    SHEETS_MAX_STALENESS: int = int(os.getenv("SHEETS_MAX_STALENESS", "300"))
+
+    # Etapas del export a Sheets: sondeo de validaciones Anti-Farming, timeout y reintentos (segundos)
+    SHEETS_ANTI_FARMING_INTERVAL: int = int(os.getenv("SHEETS_ANTI_FARMING_INTERVAL", "120"))
+    SHEETS_STAGE_TIMEOUT: float = float(os.getenv("SHEETS_STAGE_TIMEOUT", "180"))
+    SHEETS_STAGE_RETRIES: int = int(os.getenv("SHEETS_STAGE_RETRIES", "2"))
+
+    # Caché de practicantes (id_discord -> practicante_id)
+    PRACTICANTE_CACHE_TTL: int = int(os.getenv("PRACTICANTE_CACHE_TTL", "1800"))
+    PRACTICANTE_CACHE_MAXSIZE: int = int(os.getenv("PRACTICANTE_CACHE_MAXSIZE", "2048"))
+
+    # Envío de métricas al backend (cola acotada, lotes y reintentos con backoff, en segundos)
+    BACKEND_QUEUE_MAXSIZE: int = int(os.getenv("BACKEND_QUEUE_MAXSIZE", "1440"))
+    BACKEND_BATCH_SIZE: int = int(os.getenv("BACKEND_BATCH_SIZE", "20"))
+    BACKEND_FLUSH_INTERVAL: float = float(os.getenv("BACKEND_FLUSH_INTERVAL", "15"))
+    BACKEND_TIMEOUT: float = float(os.getenv("BACKEND_TIMEOUT", "10"))
+    BACKEND_MAX_BACKOFF: float = float(os.getenv("BACKEND_MAX_BACKOFF", "300"))
+
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
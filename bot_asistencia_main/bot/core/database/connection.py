@@ -1,9 +1,12 @@
 """
 Gestión de conexiones a la base de datos
-Pool de conexiones asíncrono con aiomysql
+Pool de conexiones asíncrono con aiomysql (único pool del proceso)
 """
 
-from typing import Any, Optional, List, Dict, Tuple, Union
+import asyncio
+import ssl
+import time
+from typing import Any, Optional, List, Dict, Sequence, Tuple, Union
 from contextlib import asynccontextmanager
 import aiomysql
 from aiomysql import Pool, Connection, DictCursor
@@ -12,135 +15,409 @@ from bot.config import Settings, get_settings
 from bot.core.exceptions.database import (
     DatabaseConnectionError,
     DatabaseQueryError,
+    DatabaseDuplicateEntryError,
 )
+from .instrumentation import huella, medir_consulta, registrar_espera
+
+# Parámetros de una consulta (posicionales o con nombre)
+Params = Optional[Union[Tuple, List[Any], Dict[str, Any]]]
+# Fila de resultado como diccionario columna -> valor
+Fila = Dict[str, Any]
+
+# Código de error MySQL/TiDB para clave única duplicada
+ER_DUP_ENTRY = 1062
+
+
+def _error_consulta(operacion: str, query: str, e: Exception) -> DatabaseQueryError:
+    """Traduce un error de aiomysql a la excepción del bot correspondiente"""
+    if isinstance(e, aiomysql.IntegrityError) and e.args and e.args[0] == ER_DUP_ENTRY:
+        return DatabaseDuplicateEntryError(f"Registro duplicado: {e}", query=huella(query))
+    return DatabaseQueryError(f"Error ejecutando {operacion}: {e}", query=huella(query))
+
+
+class Transaccion:
+    """
+    Conexión fijada durante una transacción
+
+    Todas las sentencias usan la misma conexión y se confirman juntas al
+    salir de ``Database.transaction()``; si algo falla no se aplica ninguna.
+    """
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self.ultima_query = ""
+
+    async def execute(self, query: str, params: Params = None) -> int:
+        """Ejecuta una sentencia y retorna las filas afectadas"""
+        self.ultima_query = query
+        async with medir_consulta(query) as medicion:
+            async with self.conn.cursor() as cursor:
+                medicion.filas = await cursor.execute(query, params)
+                return medicion.filas
+
+    async def executemany(self, query: str, params: Sequence[Params]) -> int:
+        """Ejecuta una sentencia para cada juego de parámetros"""
+        self.ultima_query = query
+        async with medir_consulta(query) as medicion:
+            async with self.conn.cursor() as cursor:
+                medicion.filas = await cursor.executemany(query, params) or 0
+                return medicion.filas
+
+    async def fetch_one(self, query: str, params: Params = None) -> Optional[Fila]:
+        self.ultima_query = query
+        async with medir_consulta(query) as medicion:
+            async with self.conn.cursor(DictCursor) as cursor:
+                await cursor.execute(query, params)
+                fila = await cursor.fetchone()
+                medicion.filas = 1 if fila else 0
+                return fila
+
+    async def fetch_all(self, query: str, params: Params = None) -> List[Fila]:
+        self.ultima_query = query
+        async with medir_consulta(query) as medicion:
+            async with self.conn.cursor(DictCursor) as cursor:
+                await cursor.execute(query, params)
+                filas = list(await cursor.fetchall())
+                medicion.filas = len(filas)
+                return filas
 
 
 class Database:
     """Gestor de base de datos con pool de conexiones"""
-    
+
     def __init__(self, settings: Settings):
         self.settings = settings
         self._pool: Optional[Pool] = None
-    
-    async def initialize(self) -> None:
-        """Inicializa el pool de conexiones"""
+        self._lock = asyncio.Lock()
+        # Corrutinas esperando una conexión libre del pool
+        self._esperando = 0
+
+    def _ssl_context(self) -> Optional[ssl.SSLContext]:
+        if not self.settings.DB_USE_SSL:
+            return None
+        ctx = ssl.create_default_context(cafile=self.settings.DB_SSL_CA)
+        # TiDB Cloud: se verifica el certificado pero no el hostname
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_REQUIRED
+        return ctx
+
+    async def initialize(self, minsize: Optional[int] = None, maxsize: Optional[int] = None) -> Pool:
+        """Inicializa el pool de conexiones (una sola vez aunque se llame en paralelo)"""
         if self._pool is not None:
-            return
-        
-        try:
-            self._pool = await aiomysql.create_pool(
-                minsize=self.settings.DB_POOL_MINSIZE,
-                maxsize=self.settings.DB_POOL_MAXSIZE,
-                host=self.settings.DB_HOST,
-                user=self.settings.DB_USER,
-                password=self.settings.DB_PASSWORD,
-                db=self.settings.DB_NAME,
-                port=self.settings.DB_PORT,
-                autocommit=False,
-            )
-        except Exception as e:
-            raise DatabaseConnectionError(
-                f"No se pudo conectar a la base de datos: {e}"
-            ) from e
-    
+            return self._pool
+
+        async with self._lock:
+            if self._pool is not None:
+                return self._pool
+            try:
+                self._pool = await aiomysql.create_pool(
+                    minsize=minsize if minsize is not None else self.settings.DB_POOL_MINSIZE,
+                    maxsize=maxsize if maxsize is not None else self.settings.DB_POOL_MAXSIZE,
+                    pool_recycle=self.settings.DB_POOL_RECYCLE,
+                    host=self.settings.DB_HOST,
+                    user=self.settings.DB_USER,
+                    password=self.settings.DB_PASSWORD,
+                    db=self.settings.DB_NAME,
+                    port=self.settings.DB_PORT,
+                    ssl=self._ssl_context(),
+                    # Las lecturas no abren transacción: aiomysql cierra al liberar toda
+                    # conexión que quedó IN_TRANS, y eso vaciaría el pool en cada SELECT
+                    autocommit=True,
+                )
+            except Exception as e:
+                raise DatabaseConnectionError(
+                    f"No se pudo conectar a la base de datos: {e}"
+                ) from e
+        return self._pool
+
     async def close(self) -> None:
         """Cierra el pool de conexiones"""
         if self._pool is not None:
             self._pool.close()
             await self._pool.wait_closed()
             self._pool = None
-    
+
+    async def _acquire_vivo(self, pool: Pool) -> Connection:
+        """
+        Obtiene una conexión del pool; si estuvo ociosa más de DB_POOL_PING_IDLE
+        segundos se verifica con ping y, si está muerta, se descarta y se pide otra.
+        """
+        inicio = time.perf_counter()
+        try:
+            for _ in range(pool.maxsize + 1):
+                self._esperando += 1
+                try:
+                    conn = await pool.acquire()
+                finally:
+                    self._esperando -= 1
+
+                ociosa = asyncio.get_running_loop().time() - conn.last_usage
+                if ociosa < self.settings.DB_POOL_PING_IDLE:
+                    return conn
+                try:
+                    await conn.ping(reconnect=False)
+                    return conn
+                except (aiomysql.Error, OSError):
+                    # Conexión cortada por el servidor: cerrarla para que el pool la descarte
+                    conn.close()
+                    pool.release(conn)
+            # Todas las conexiones estaban muertas: la siguiente ya es nueva
+            return await pool.acquire()
+        finally:
+            registrar_espera(time.perf_counter() - inicio)
+
     @asynccontextmanager
     async def get_connection(self):
         """Obtiene una conexión del pool (context manager)"""
-        if self._pool is None:
-            await self.initialize()
-        
-        conn = await self._pool.acquire()
+        pool = await self.initialize()
+        conn = await self._acquire_vivo(pool)
         try:
             yield conn
         finally:
-            self._pool.release(conn)
-    
-    async def fetch_one(
-        self,
-        query: str,
-        params: Optional[Union[Tuple, Dict[str, Any]]] = None
-    ) -> Optional[Dict[str, Any]]:
+            # Si quien la usó dejó una transacción abierta se cierra aquí, para que
+            # el pool pueda reutilizar la conexión en vez de descartarla
+            if not conn.closed and conn.get_transaction_status():
+                try:
+                    await conn.rollback()
+                except (aiomysql.Error, OSError):
+                    conn.close()
+            pool.release(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Transacción sobre una sola conexión con un único commit (context manager)
+
+        Example:
+            async with db.transaction() as tx:
+                await tx.execute("DELETE ...", (id,))
+                await tx.execute("UPDATE ...", (id,))
+
+        Raises:
+            DatabaseQueryError: si alguna sentencia falla (se hace rollback)
+            DatabaseDuplicateEntryError: si se viola una clave única
+        """
+        async with self.get_connection() as conn:
+            tx = Transaccion(conn)
+            try:
+                await conn.begin()
+                yield tx
+                await conn.commit()
+            except aiomysql.Error as e:
+                await conn.rollback()
+                raise _error_consulta("transaction", tx.ultima_query, e) from e
+            except BaseException:
+                await conn.rollback()
+                raise
+
+    async def fetch_one(self, query: str, params: Params = None) -> Optional[Fila]:
         """
         Ejecuta una consulta y retorna un solo resultado
-        
+
         Args:
             query: Query SQL
             params: Parámetros para la query
-            
+
         Returns:
             Diccionario con el resultado o None
         """
-        async with self.get_connection() as conn:
+        async with medir_consulta(query) as medicion, self.get_connection() as conn:
             try:
                 async with conn.cursor(DictCursor) as cursor:
                     await cursor.execute(query, params)
-                    return await cursor.fetchone()
-            except Exception as e:
-                raise DatabaseQueryError(
-                    f"Error ejecutando fetch_one: {e}",
-                    details=query
-                ) from e
-    
-    async def fetch_all(
-        self,
-        query: str,
-        params: Optional[Union[Tuple, Dict[str, Any]]] = None
-    ) -> List[Dict[str, Any]]:
+                    fila = await cursor.fetchone()
+                    medicion.filas = 1 if fila else 0
+                    return fila
+            except aiomysql.Error as e:
+                raise _error_consulta("fetch_one", query, e) from e
+
+    async def fetch_all(self, query: str, params: Params = None) -> List[Fila]:
         """
         Ejecuta una consulta y retorna todos los resultados
-        
+
         Args:
             query: Query SQL
             params: Parámetros para la query
-            
+
         Returns:
             Lista de diccionarios con los resultados
         """
-        async with self.get_connection() as conn:
+        async with medir_consulta(query) as medicion, self.get_connection() as conn:
             try:
                 async with conn.cursor(DictCursor) as cursor:
                     await cursor.execute(query, params)
-                    return list(await cursor.fetchall())
-            except Exception as e:
-                raise DatabaseQueryError(
-                    f"Error ejecutando fetch_all: {e}",
-                    details=query
-                ) from e
-    
-    async def execute(
-        self,
-        query: str,
-        params: Optional[Union[Tuple, Dict[str, Any]]] = None
-    ) -> int:
+                    filas = list(await cursor.fetchall())
+                    medicion.filas = len(filas)
+                    return filas
+            except aiomysql.Error as e:
+                raise _error_consulta("fetch_all", query, e) from e
+
+    async def execute(self, query: str, params: Params = None) -> int:
         """
         Ejecuta una consulta de inserción/actualización/eliminación
-        
+
         Args:
             query: Query SQL
             params: Parámetros para la query
-            
+
         Returns:
             ID del último registro insertado o 0
         """
-        async with self.get_connection() as conn:
+        async with medir_consulta(query) as medicion, self.get_connection() as conn:
             try:
+                # autocommit: la sentencia se confirma sola
                 async with conn.cursor() as cursor:
-                    await cursor.execute(query, params)
-                    await conn.commit()
+                    medicion.filas = await cursor.execute(query, params)
                     return cursor.lastrowid or 0
-            except Exception as e:
+            except aiomysql.Error as e:
+                raise _error_consulta("execute", query, e) from e
+
+    async def execute_rowcount(self, query: str, params: Params = None) -> int:
+        """
+        Igual que execute pero retorna las filas afectadas
+
+        Raises:
+            DatabaseDuplicateEntryError: si se viola una clave única
+        """
+        async with medir_consulta(query) as medicion, self.get_connection() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    affected = await cursor.execute(query, params)
+                    medicion.filas = affected
+                    return affected
+            except aiomysql.Error as e:
+                raise _error_consulta("execute_rowcount", query, e) from e
+
+    async def execute_batch(self, statements: Sequence[Tuple[str, Params]]) -> List[int]:
+        """
+        Ejecuta varias sentencias en una sola conexión y transacción (un único commit)
+
+        Args:
+            statements: Pares (query, params) en orden de ejecución
+
+        Returns:
+            Filas afectadas por cada sentencia
+
+        Raises:
+            DatabaseDuplicateEntryError: si alguna sentencia viola una clave única
+        """
+        async with self.transaction() as tx:
+            return [await tx.execute(query, params) for query, params in statements]
+
+    async def bulk_upsert(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Sequence[Sequence[Any]],
+        key_column: str,
+        update_columns: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        INSERT ... ON DUPLICATE KEY UPDATE de varias filas en lotes, en una sola transacción
+
+        Returns:
+            Cuántas filas se insertaron, actualizaron y quedaron sin cambios
+        """
+        resultado = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if not rows:
+            return resultado
+
+        chunk_size = chunk_size or self.settings.DB_BULK_CHUNK_SIZE
+        update_columns = update_columns if update_columns is not None else [c for c in columns if c != key_column]
+        key_index = list(columns).index(key_column)
+
+        fila_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        update_sql = ", ".join(f"{c} = VALUES({c})" for c in update_columns)
+
+        # Plantilla real de cada lote: su huella agrupa igual que un INSERT ... ON DUPLICATE KEY
+        # de una fila con las mismas columnas (la huella colapsa las filas de VALUES)
+        insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {{}} ON DUPLICATE KEY UPDATE {update_sql}"
+        consulta = insert_sql.format(fila_sql)
+        async with medir_consulta(consulta) as medicion, self.get_connection() as conn:
+            try:
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    for i in range(0, len(rows), chunk_size):
+                        chunk = rows[i:i + chunk_size]
+                        keys = [row[key_index] for row in chunk]
+
+                        # Filas ya existentes para separar inserciones de actualizaciones
+                        await cursor.execute(
+                            f"SELECT COUNT(*) FROM {table} WHERE {key_column} IN ({', '.join(['%s'] * len(keys))})",
+                            keys
+                        )
+                        existentes = (await cursor.fetchone())[0]
+
+                        query = insert_sql.format(", ".join([fila_sql] * len(chunk)))
+                        # MySQL cuenta 1 por inserción, 2 por actualización y 0 si no cambió
+                        affected = await cursor.execute(query, [v for row in chunk for v in row])
+
+                        insertadas = len(chunk) - existentes
+                        actualizadas = (affected - insertadas) // 2
+                        resultado["inserted"] += insertadas
+                        resultado["updated"] += actualizadas
+                        resultado["unchanged"] += existentes - actualizadas
+                await conn.commit()
+                medicion.filas = len(rows)
+                return resultado
+            except aiomysql.Error as e:
                 await conn.rollback()
-                raise DatabaseQueryError(
-                    f"Error ejecutando execute: {e}",
-                    details=query
-                ) from e
+                raise _error_consulta("bulk_upsert", consulta, e) from e
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Conexiones del pool: abiertas, libres, en uso y corrutinas en espera"""
+        if self._pool is None:
+            return {"size": 0, "free": 0, "in_use": 0, "waiting": self._esperando, "minsize": 0, "maxsize": 0}
+        return {
+            "size": self._pool.size,
+            "free": self._pool.freesize,
+            "in_use": self._pool.size - self._pool.freesize,
+            "waiting": self._esperando,
+            "minsize": self._pool.minsize,
+            "maxsize": self._pool.maxsize,
+        }
+
+    async def verificar_reutilizacion(self, lecturas: int = 5) -> bool:
+        """
+        Comprueba que lecturas repetidas reutilicen las conexiones del pool:
+        el tamaño no debe cambiar ni aparecer más conexiones distintas que las abiertas
+        """
+        antes = self.pool_stats()["size"]
+        conexiones = set()
+        for _ in range(lecturas):
+            fila = await self.fetch_one("SELECT CONNECTION_ID() AS id")
+            conexiones.add(fila["id"])
+        despues = self.pool_stats()["size"]
+        return despues == antes and len(conexiones) <= max(antes, 1)
+
+    async def ping(self, timeout: float = 3.0) -> bool:
+        """Comprueba que el pool entregue una conexión viva dentro del timeout"""
+        async def _ping():
+            async with self.get_connection() as conn:
+                await conn.ping(reconnect=False)
+        try:
+            await asyncio.wait_for(_ping(), timeout=timeout)
+            return True
+        except (asyncio.TimeoutError, aiomysql.Error, OSError, DatabaseConnectionError):
+            return False
+
+    async def warmup(self, conexiones: Optional[int] = None) -> int:
+        """
+        Abre y verifica varias conexiones a la vez antes de un pico de uso
+
+        Returns:
+            Cantidad de conexiones listas
+        """
+        pool = await self.initialize()
+        n = min(conexiones or self.settings.DB_POOL_WARMUP_CONNECTIONS, pool.maxsize)
+
+        async def _una():
+            async with self.get_connection() as conn:
+                await conn.ping(reconnect=False)
+
+        resultados = await asyncio.gather(*(_una() for _ in range(n)), return_exceptions=True)
+        return sum(1 for r in resultados if not isinstance(r, BaseException))
 
 
 # Instancia global de la base de datos
@@ -153,5 +430,3 @@ def get_database() -> Database:
     if _database is None:
         _database = Database(get_settings())
     return _database
-
-
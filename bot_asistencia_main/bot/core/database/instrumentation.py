@@ -0,0 +1,176 @@
+"""
+Instrumentación de consultas a la base de datos
+
+Mide duración, filas, espera del pool y clase de error de cada consulta,
+agrupando por una huella normalizada del SQL (literales y parámetros
+reemplazados por '?'). Registra las consultas lentas y admite muestreo
+para reducir el costo en producción.
+"""
+
+import logging
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from bot.config.settings import Settings
+from bot.core.metrics import Histograma, metrics
+
+_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_CADENAS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_PARAMETROS = re.compile(r"%\(\w+\)s|%s")
+_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_FILAS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_ESPACIOS = re.compile(r"\s+")
+_TABLA = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|VIEW)\s+`?(\w+)", re.IGNORECASE)
+
+# Longitud máxima de una huella (las consultas largas se recortan)
+MAX_HUELLA = 300
+
+
+@lru_cache(maxsize=512)
+def huella(query: str) -> str:
+    """
+    Normaliza una consulta para agrupar sus ejecuciones
+
+    Ejemplo: ``SELECT * FROM t WHERE id IN (%s, %s) AND x = 'a'``
+    se convierte en ``SELECT * FROM t WHERE id IN (...) AND x = ?``;
+    ``VALUES (%s, %s), (%s, %s)`` queda como ``VALUES (...)``
+    """
+    texto = _COMENTARIOS.sub(" ", query)
+    texto = _CADENAS.sub("?", texto)
+    texto = _PARAMETROS.sub("?", texto)
+    texto = _NUMEROS.sub("?", texto)
+    texto = _LISTAS.sub("(...)", texto)
+    texto = _FILAS.sub("(...)", texto)  # INSERT de varias filas: misma huella sin importar cuántas
+    texto = _ESPACIOS.sub(" ", texto).strip()
+    return texto[:MAX_HUELLA]
+
+
+@lru_cache(maxsize=512)
+def nombre_corto(query: str) -> str:
+    """Nombre de baja cardinalidad: verbo + primera tabla (p. ej. 'SELECT asistencia')"""
+    partes = query.split(None, 1)
+    verbo = partes[0].upper() if partes else "?"
+    tabla = _TABLA.search(query)
+    return f"{verbo} {tabla.group(1)}" if tabla else verbo
+
+
+class Medicion:
+    """Datos de una ejecución en curso (los completa la capa de acceso)"""
+
+    __slots__ = ("espera", "filas", "error")
+
+    def __init__(self):
+        self.espera = 0.0
+        self.filas: Optional[int] = None
+        self.error: Optional[str] = None
+
+
+class EstadisticaConsulta:
+    """Acumulado de una huella: duración, filas, espera del pool y errores por clase"""
+
+    __slots__ = ("duracion", "filas", "espera", "errores")
+
+    def __init__(self):
+        self.duracion = Histograma()
+        self.filas = 0
+        self.espera = 0.0
+        self.errores: Dict[str, int] = {}
+
+    def registrar(self, segundos: float, medicion: Medicion) -> None:
+        self.duracion.registrar(segundos)
+        self.filas += medicion.filas or 0
+        self.espera += medicion.espera
+        if medicion.error:
+            self.errores[medicion.error] = self.errores.get(medicion.error, 0) + 1
+
+
+class RegistroConsultas:
+    """Estadísticas por huella con un máximo de huellas distintas"""
+
+    def __init__(self, max_huellas: int = 300):
+        self.max_huellas = max_huellas
+        self.por_huella: Dict[str, EstadisticaConsulta] = {}
+
+    def registrar(self, clave: str, segundos: float, medicion: Medicion) -> None:
+        stats = self.por_huella.get(clave)
+        if stats is None:
+            if len(self.por_huella) >= self.max_huellas:
+                clave = "_otras"
+                stats = self.por_huella.get(clave)
+            if stats is None:
+                stats = self.por_huella[clave] = EstadisticaConsulta()
+        stats.registrar(segundos, medicion)
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Las ``n`` huellas con mayor tiempo total acumulado"""
+        ordenadas = sorted(self.por_huella.items(), key=lambda kv: kv[1].duracion.suma, reverse=True)
+        resultado = []
+        for clave, stats in ordenadas[:n]:
+            total = stats.duracion.total
+            resultado.append({
+                "query": clave,
+                "total_s": round(stats.duracion.suma, 3),
+                "rows": stats.filas,
+                "avg_wait_ms": round(stats.espera / total * 1000, 2) if total else 0.0,
+                "errors": dict(stats.errores),
+                **stats.duracion.resumen(),
+            })
+        return resultado
+
+    def limpiar(self) -> None:
+        self.por_huella.clear()
+
+
+# Registro global de consultas y medición activa (para anotar la espera del pool)
+consultas = RegistroConsultas()
+_medicion_actual: ContextVar[Optional[Medicion]] = ContextVar("medicion_consulta", default=None)
+
+
+def registrar_espera(segundos: float) -> None:
+    """Anota la espera del pool en la consulta en curso y en las métricas globales"""
+    metrics.registrar_espera_pool(segundos)
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        medicion.espera += segundos
+
+
+@asynccontextmanager
+async def medir_consulta(query: str):
+    """
+    Mide una consulta completa (incluida la espera del pool)
+
+    El histograma por nombre corto se alimenta siempre; las estadísticas
+    por huella solo para la fracción ``DB_QUERY_SAMPLE_RATE``. Las consultas
+    que superan ``DB_SLOW_QUERY_MS`` se registran siempre en el log.
+
+    Yields:
+        Medicion donde la capa de acceso anota las filas
+    """
+    medicion = Medicion()
+    token = _medicion_actual.set(medicion)
+    inicio = time.perf_counter()
+    try:
+        yield medicion
+    except BaseException as e:
+        medicion.error = type(e.__cause__ or e).__name__
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        _medicion_actual.reset(token)
+        metrics.registrar_consulta(nombre_corto(query), segundos, medicion.error is not None)
+
+        tasa = Settings.DB_QUERY_SAMPLE_RATE
+        if tasa >= 1.0 or random.random() < tasa:
+            consultas.registrar(huella(query), segundos, medicion)
+
+        if segundos * 1000 >= Settings.DB_SLOW_QUERY_MS:
+            logging.warning(
+                f"🐢 Consulta lenta ({segundos * 1000:.0f} ms, espera pool {medicion.espera * 1000:.0f} ms, "
+                f"filas {medicion.filas}, error {medicion.error}): {huella(query)}"
+            )
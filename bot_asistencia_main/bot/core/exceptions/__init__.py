@@ -1,7 +1,12 @@
 """Excepciones personalizadas del bot"""
 
 from .base import BotException
-from .database import DatabaseError, DatabaseConnectionError, DatabaseQueryError
+from .database import (
+    DatabaseError,
+    DatabaseConnectionError,
+    DatabaseQueryError,
+    DatabaseDuplicateEntryError,
+)
 from .validation import ValidationError, PermissionError, NotFoundError
 
 __all__ = [
@@ -9,6 +14,7 @@ __all__ = [
     "DatabaseError",
     "DatabaseConnectionError",
     "DatabaseQueryError",
+    "DatabaseDuplicateEntryError",
     "ValidationError",
     "PermissionError",
     "NotFoundError",
@@ -3,8 +3,8 @@
 from .base import BotException
 
 
-class DatabaseError(BotException):
-    """Error general de base de datos"""
+class DatabaseError(BotException, RuntimeError):
+    """Error general de base de datos (también RuntimeError, como el antiguo database.py)"""
     pass
 
 
@@ -14,7 +14,18 @@ class DatabaseConnectionError(DatabaseError):
 
 
 class DatabaseQueryError(DatabaseError):
-    """Error al ejecutar una consulta"""
-    pass
+    """
+    Error al ejecutar una consulta
+
+    La sentencia se guarda aparte en ``query`` (su huella normalizada) y no
+    forma parte del mensaje, que puede terminar en una respuesta de Discord.
+    """
 
+    def __init__(self, message: str, details: str = None, query: str = None):
+        super().__init__(message, details)
+        self.query = query
 
+
+class DatabaseDuplicateEntryError(DatabaseQueryError):
+    """Se intentó insertar una fila que viola una clave única"""
+    pass
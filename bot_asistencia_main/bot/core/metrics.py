@@ -0,0 +1,332 @@
+"""
+Métricas de latencia y rendimiento en memoria fija
+
+Histogramas con buckets logarítmicos (estilo HDR) para percentiles,
+series circulares para muestras recientes y un registro global que
+reúne comandos, base de datos, Google Sheets y gateway.
+"""
+
+import bisect
+import datetime
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class Histograma:
+    """
+    Histograma de duraciones con buckets logarítmicos
+
+    Los límites crecen en proporción fija (``factor``) desde ``minimo``
+    hasta ``maximo`` segundos, por lo que la memoria es constante y el
+    error relativo de los percentiles queda acotado por el factor.
+    """
+
+    def __init__(self, minimo: float = 0.0005, maximo: float = 120.0, factor: float = 1.25):
+        pasos = math.ceil(math.log(maximo / minimo, factor))
+        self.limites: List[float] = [minimo * factor ** i for i in range(pasos + 1)]
+        # Un bucket extra para valores por encima del máximo
+        self.cuentas: List[int] = [0] * (len(self.limites) + 1)
+        self.total = 0
+        self.suma = 0.0
+        self.max = 0.0
+
+    def registrar(self, segundos: float) -> None:
+        """Registra una duración en segundos"""
+        segundos = max(segundos, 0.0)
+        self.cuentas[bisect.bisect_left(self.limites, segundos)] += 1
+        self.total += 1
+        self.suma += segundos
+        if segundos > self.max:
+            self.max = segundos
+
+    def percentil(self, p: float) -> float:
+        """Límite superior del bucket que contiene el percentil ``p`` (0-100)"""
+        if not self.total:
+            return 0.0
+        objetivo = math.ceil(self.total * p / 100)
+        acumulado = 0
+        for i, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return min(self.limites[i], self.max) if i < len(self.limites) else self.max
+        return self.max
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """Pares (límite superior, cuenta acumulada) para exposición tipo Prometheus"""
+        acumulado = 0
+        resultado = []
+        for limite, cuenta in zip(self.limites, self.cuentas):
+            acumulado += cuenta
+            resultado.append((limite, acumulado))
+        return resultado
+
+    def resumen(self) -> Dict[str, Any]:
+        """Cantidad, promedio, p50/p95/p99 y máximo en milisegundos"""
+        return {
+            "count": self.total,
+            "avg_ms": round(self.suma / self.total * 1000, 2) if self.total else 0.0,
+            "p50_ms": round(self.percentil(50) * 1000, 2),
+            "p95_ms": round(self.percentil(95) * 1000, 2),
+            "p99_ms": round(self.percentil(99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class SerieCircular:
+    """Últimas ``maxlen`` muestras (timestamp, valor) en un buffer circular"""
+
+    def __init__(self, maxlen: int = 120):
+        self._datos: Deque[Tuple[float, float]] = deque(maxlen=maxlen)
+
+    def agregar(self, valor: float) -> None:
+        self._datos.append((time.time(), valor))
+
+    def ultimo(self) -> Optional[float]:
+        return self._datos[-1][1] if self._datos else None
+
+    def valores(self) -> List[float]:
+        return [v for _, v in self._datos]
+
+    def resumen(self) -> Dict[str, Any]:
+        valores = sorted(self.valores())
+        if not valores:
+            return {"count": 0}
+        return {
+            "count": len(valores),
+            "last": round(self._datos[-1][1], 2),
+            "min": round(valores[0], 2),
+            "p50": round(valores[len(valores) // 2], 2),
+            "max": round(valores[-1], 2),
+        }
+
+
+class GrupoHistogramas:
+    """Histogramas por nombre con un máximo de claves (las nuevas van a '_otros')"""
+
+    def __init__(self, max_claves: int = 200):
+        self.max_claves = max_claves
+        self.por_nombre: Dict[str, Histograma] = {}
+        self.errores: Dict[str, int] = {}
+
+    def _clave(self, nombre: str) -> str:
+        if nombre in self.por_nombre or len(self.por_nombre) < self.max_claves:
+            return nombre
+        return "_otros"
+
+    def registrar(self, nombre: str, segundos: float, error: bool = False) -> None:
+        clave = self._clave(nombre)
+        hist = self.por_nombre.get(clave)
+        if hist is None:
+            hist = self.por_nombre[clave] = Histograma()
+        hist.registrar(segundos)
+        if error:
+            self.errores[clave] = self.errores.get(clave, 0) + 1
+
+    def resumen(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            nombre: {**hist.resumen(), "errors": self.errores.get(nombre, 0)}
+            for nombre, hist in sorted(self.por_nombre.items())
+        }
+
+
+class BotMetrics:
+    """Métricas del bot: eventos, comandos, base de datos, Sheets, gateway y uptime"""
+
+    def __init__(self):
+        self.start_time = datetime.datetime.now(datetime.timezone.utc)
+        self.events_processed_today = 0
+        self.last_reset_day = self.start_time.day
+
+        # Latencias
+        self.comandos = GrupoHistogramas(max_claves=100)
+        self.recepcion_interacciones = Histograma()
+        self.db_consultas = GrupoHistogramas()
+        self.db_espera_pool = Histograma()
+        self.sheets = GrupoHistogramas(max_claves=20)
+        self.sheets_ultimo: Dict[str, Dict[str, Any]] = {}
+        self.gateway = SerieCircular(maxlen=1440)
+
+        # Cachés en memoria (nombre -> objeto con stats())
+        self.caches: Dict[str, Any] = {}
+
+        # Uptime real: tiempo conectado al gateway sobre el tiempo de vida
+        self._inicio_mono = time.monotonic()
+        self._conectado_desde: Optional[float] = None
+        self._segundos_conectado = 0.0
+
+    def increment_event_count(self):
+        """Incrementa el contador de eventos y lo resetea si es un nuevo día."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if now.day != self.last_reset_day:
+            self.events_processed_today = 0
+            self.last_reset_day = now.day
+        self.events_processed_today += 1
+
+    def get_uptime(self):
+        """Calcula el tiempo de actividad del bot."""
+        return datetime.datetime.now(datetime.timezone.utc) - self.start_time
+
+    # Comandos
+    def registrar_comando(self, nombre: str, segundos: float, error: bool = False) -> None:
+        self.comandos.registrar(nombre, segundos, error)
+
+    def registrar_recepcion(self, segundos: float) -> None:
+        self.recepcion_interacciones.registrar(segundos)
+
+    # Base de datos
+    def registrar_consulta(self, nombre: str, segundos: float, error: bool = False) -> None:
+        self.db_consultas.registrar(nombre, segundos, error)
+
+    def registrar_espera_pool(self, segundos: float) -> None:
+        self.db_espera_pool.registrar(segundos)
+
+    # Google Sheets
+    def registrar_sheets(self, etapa: str, segundos: float, ok: bool) -> None:
+        self.sheets.registrar(etapa, segundos, error=not ok)
+        self.sheets_ultimo[etapa] = {
+            "duracion_s": round(segundos, 3),
+            "ok": ok,
+            "timestamp": time.time(),
+            "ultimo_exito": time.time() if ok else self.sheets_ultimo.get(etapa, {}).get("ultimo_exito"),
+        }
+
+    # Gateway y conexión
+    def registrar_gateway(self, latencia_s: float) -> None:
+        if math.isfinite(latencia_s):
+            self.gateway.agregar(latencia_s * 1000)
+
+    def marcar_conectado(self) -> None:
+        if self._conectado_desde is None:
+            self._conectado_desde = time.monotonic()
+
+    def marcar_desconectado(self) -> None:
+        if self._conectado_desde is not None:
+            self._segundos_conectado += time.monotonic() - self._conectado_desde
+            self._conectado_desde = None
+
+    def uptime_porcentaje(self) -> float:
+        """Porcentaje del tiempo de vida del proceso con el gateway conectado"""
+        ahora = time.monotonic()
+        conectado = self._segundos_conectado
+        if self._conectado_desde is not None:
+            conectado += ahora - self._conectado_desde
+        vida = ahora - self._inicio_mono
+        return round(min(conectado / vida, 1.0) * 100, 2) if vida > 0 else 0.0
+
+    def registrar_cache(self, nombre: str, cache: Any) -> None:
+        """Expone los aciertos, fallos y tamaño de un caché (TTLCache) en las métricas"""
+        self.caches[nombre] = cache
+
+    def resumen(self) -> Dict[str, Any]:
+        """Resumen serializable para el backend"""
+        return {
+            "comandos": self.comandos.resumen(),
+            "recepcion_interacciones": self.recepcion_interacciones.resumen(),
+            "db": {
+                "consultas": self.db_consultas.resumen(),
+                "espera_pool": self.db_espera_pool.resumen(),
+            },
+            "sheets": {
+                "etapas": self.sheets.resumen(),
+                "ultimo": self.sheets_ultimo,
+            },
+            "gateway_ms": self.gateway.resumen(),
+            "caches": {nombre: cache.stats() for nombre, cache in sorted(self.caches.items())},
+        }
+
+
+def _etiquetas(**etiquetas: Any) -> str:
+    if not etiquetas:
+        return ""
+    partes = []
+    for clave, valor in etiquetas.items():
+        texto = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{clave}="{texto}"')
+    return "{" + ",".join(partes) + "}"
+
+
+class ExpositorPrometheus:
+    """Construye el formato de texto de Prometheus (exposition format 0.0.4)"""
+
+    def __init__(self):
+        self._lineas: List[str] = []
+        self._declaradas = set()
+
+    def _cabecera(self, nombre: str, tipo: str, ayuda: str) -> None:
+        if nombre not in self._declaradas:
+            self._declaradas.add(nombre)
+            self._lineas.append(f"# HELP {nombre} {ayuda}")
+            self._lineas.append(f"# TYPE {nombre} {tipo}")
+
+    def gauge(self, nombre: str, valor: float, ayuda: str, **etiquetas: Any) -> None:
+        self._cabecera(nombre, "gauge", ayuda)
+        self._lineas.append(f"{nombre}{_etiquetas(**etiquetas)} {valor}")
+
+    def counter(self, nombre: str, valor: float, ayuda: str, **etiquetas: Any) -> None:
+        self._cabecera(nombre, "counter", ayuda)
+        self._lineas.append(f"{nombre}{_etiquetas(**etiquetas)} {valor}")
+
+    def histograma(self, nombre: str, hist: Histograma, ayuda: str, **etiquetas: Any) -> None:
+        self._cabecera(nombre, "histogram", ayuda)
+        for limite, acumulado in hist.buckets():
+            self._lineas.append(f"{nombre}_bucket{_etiquetas(**etiquetas, le=f'{limite:.6g}')} {acumulado}")
+        self._lineas.append(f"{nombre}_bucket{_etiquetas(**etiquetas, le='+Inf')} {hist.total}")
+        self._lineas.append(f"{nombre}_sum{_etiquetas(**etiquetas)} {hist.suma}")
+        self._lineas.append(f"{nombre}_count{_etiquetas(**etiquetas)} {hist.total}")
+
+    def texto(self) -> str:
+        return "\n".join(self._lineas) + "\n"
+
+
+def exportar_prometheus(m: BotMetrics, pool: Optional[Dict[str, int]] = None) -> str:
+    """Métricas del bot (y opcionalmente del pool de BD) en formato Prometheus"""
+    exp = ExpositorPrometheus()
+
+    exp.gauge("bot_uptime_ratio", m.uptime_porcentaje() / 100, "Fraccion del tiempo de vida con el gateway conectado")
+    exp.gauge("bot_eventos_procesados_hoy", m.events_processed_today, "Eventos (mensajes e interacciones) procesados hoy")
+    latencia = m.gateway.ultimo()
+    if latencia is not None:
+        exp.gauge("bot_gateway_latencia_segundos", latencia / 1000, "Ultima latencia medida del gateway de Discord")
+
+    exp.histograma("bot_interaccion_recepcion_segundos", m.recepcion_interacciones,
+                   "Demora entre la creacion de la interaccion y su llegada al bot")
+    for nombre, hist in sorted(m.comandos.por_nombre.items()):
+        exp.histograma("bot_comando_duracion_segundos", hist, "Duracion de comandos desde la interaccion", comando=nombre)
+    for nombre in sorted(m.comandos.por_nombre):
+        exp.counter("bot_comando_errores_total", m.comandos.errores.get(nombre, 0), "Comandos terminados con error", comando=nombre)
+
+    for nombre, hist in sorted(m.db_consultas.por_nombre.items()):
+        exp.histograma("bot_db_consulta_duracion_segundos", hist, "Duracion de consultas a la BD", consulta=nombre)
+    for nombre in sorted(m.db_consultas.por_nombre):
+        exp.counter("bot_db_consulta_errores_total", m.db_consultas.errores.get(nombre, 0), "Consultas a la BD con error", consulta=nombre)
+    exp.histograma("bot_db_pool_espera_segundos", m.db_espera_pool, "Espera para obtener una conexion del pool")
+
+    if pool is not None:
+        exp.gauge("bot_db_pool_conexiones", pool["size"], "Conexiones del pool por estado", estado="abiertas")
+        exp.gauge("bot_db_pool_conexiones", pool["in_use"], "Conexiones del pool por estado", estado="en_uso")
+        exp.gauge("bot_db_pool_conexiones", pool["free"], "Conexiones del pool por estado", estado="libres")
+        exp.gauge("bot_db_pool_esperando", pool["waiting"], "Corrutinas esperando una conexion del pool")
+        exp.gauge("bot_db_pool_maxsize", pool["maxsize"], "Tamano maximo del pool")
+
+    for nombre, cache in sorted(m.caches.items()):
+        stats = cache.stats()
+        exp.counter("bot_cache_aciertos_total", stats["hits"], "Lecturas resueltas por el cache", cache=nombre)
+        exp.counter("bot_cache_fallos_total", stats["misses"], "Lecturas que no estaban en el cache", cache=nombre)
+        exp.gauge("bot_cache_entradas", stats["size"], "Entradas vigentes en el cache", cache=nombre)
+
+    for etapa, hist in sorted(m.sheets.por_nombre.items()):
+        exp.histograma("bot_sheets_duracion_segundos", hist, "Duracion de las etapas de sincronizacion con Sheets", etapa=etapa)
+    for etapa, ultimo in sorted(m.sheets_ultimo.items()):
+        exp.gauge("bot_sheets_ultima_duracion_segundos", ultimo["duracion_s"], "Duracion de la ultima ejecucion", etapa=etapa)
+        exp.gauge("bot_sheets_ultimo_ok", int(ultimo["ok"]), "1 si la ultima ejecucion termino bien", etapa=etapa)
+        exp.gauge("bot_sheets_ultimo_timestamp_segundos", ultimo["timestamp"], "Momento de la ultima ejecucion (epoch)", etapa=etapa)
+        if ultimo["ultimo_exito"] is not None:
+            exp.gauge("bot_sheets_ultimo_exito_timestamp_segundos", ultimo["ultimo_exito"], "Momento del ultimo exito (epoch)", etapa=etapa)
+
+    return exp.texto()
+
+
+# Instancia global de métricas
+metrics = BotMetrics()
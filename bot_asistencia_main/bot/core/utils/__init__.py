@@ -23,6 +23,7 @@ from .permissions import (
     check_channel_permission,
     check_role_permission,
 )
+from .cache import TTLCache
 
 __all__ = [
     "validate_channel",
@@ -42,6 +43,7 @@ __all__ = [
     "is_weekday",
     "check_channel_permission",
     "check_role_permission",
+    "TTLCache",
 ]
 
 
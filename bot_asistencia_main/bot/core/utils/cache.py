@@ -0,0 +1,84 @@
+"""Caché en memoria con límite de tamaño y expiración por tiempo"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Iterable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Caché LRU acotado con expiración (TTL) por entrada
+
+    Las entradas más antiguas se descartan al superar ``maxsize`` y las
+    expiradas se eliminan al ser consultadas. Lleva la cuenta de aciertos
+    y fallos para poder medir su efectividad.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        Obtiene un valor del caché
+
+        Args:
+            key: Clave a buscar
+
+        Returns:
+            El valor almacenado o None si no existe o expiró
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        """Guarda un valor, desalojando la entrada menos usada si está lleno"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def update(self, items: Iterable[Tuple[K, V]]) -> None:
+        """Carga varias entradas de una sola vez"""
+        for key, value in items:
+            self.set(key, value)
+
+    def invalidate(self, key: K) -> None:
+        """Elimina una entrada si existe"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Vacía el caché (los contadores se conservan)"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna tamaño, aciertos, fallos y tasa de aciertos"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -27,12 +27,19 @@ class ConfirmacionEliminar(discord.ui.View):
         
         await interaction.response.defer()
         try:
-            query_check = "SELECT id FROM practicante WHERE id_discord = %s"
-            practicante = await db.fetch_one(query_check, (self.id_discord,))
+            # Una sola conexión y un solo commit. Las tablas hijas se borran explícitamente
+            # por si el servidor (TiDB) tiene deshabilitadas las foreign keys / ON DELETE CASCADE.
+            async with db.transaction() as tx:
+                practicante = await tx.fetch_one("SELECT id FROM practicante WHERE id_discord = %s", (self.id_discord,))
+                if practicante:
+                    for tabla in ("asistencia", "asistencia_recuperacion", "practicante_totales"):
+                        await tx.execute(f"DELETE FROM {tabla} WHERE practicante_id = %s", (practicante['id'],))
+                    await tx.execute("DELETE FROM practicante WHERE id = %s", (practicante['id'],))
             if practicante:
-                await db.execute_query("DELETE FROM asistencia WHERE practicante_id = %s", (practicante['id'],))
-                await db.execute_query("DELETE FROM asistencia_recuperacion WHERE practicante_id = %s", (practicante['id'],))
-                await db.execute_query("DELETE FROM practicante WHERE id = %s", (practicante['id'],))
+                utils.invalidar_practicante(self.id_discord)
+                from google_sheets import olvidar_sync_practicantes
+                olvidar_sync_practicantes()
+                utils.marcar_cambio_asistencia()
                 await interaction.followup.edit_message(message_id=interaction.message.id, content=f"✅ **{self.nombre_completo}** eliminado.", view=None)
             else:
                 await interaction.followup.send("❌ No encontrado.", ephemeral=True)
@@ -144,13 +151,21 @@ class Admin(commands.GroupCog, name="admin"):
                 
                 query_upd = f"UPDATE asistencia SET {', '.join(updates)} WHERE id = %s"
                 params.append(existente['id'])
-                await db.execute_query(query_upd, tuple(params))
+                await db.execute_batch([
+                    (query_upd, tuple(params)),
+                    (db.sql_recalcular_totales("p.id = %s"), (p_id,)),
+                ])
+                utils.marcar_cambio_asistencia()
                 await interaction.followup.send(f"✅ Asistencia de {usuario.mention} para el {fecha_final} actualizada.", ephemeral=True)
             else:
                 # Crear nuevo registro (requiere estado o asumimos Presente)
                 if not estado_id: estado_id = await obtener_estado_asistencia('Presente')
                 query_ins = "INSERT INTO asistencia (practicante_id, fecha, hora_entrada, hora_salida, estado_id) VALUES (%s, %s, %s, %s, %s)"
-                await db.execute_query(query_ins, (p_id, fecha_final, entrada, salida, estado_id))
+                await db.execute_batch([
+                    (query_ins, (p_id, fecha_final, entrada, salida, estado_id)),
+                    (db.sql_recalcular_totales("p.id = %s"), (p_id,)),
+                ])
+                utils.marcar_cambio_asistencia()
                 await interaction.followup.send(f"✅ Nuevo registro creado para {usuario.mention} el {fecha_final}.", ephemeral=True)
 
         except Exception as e:
@@ -159,7 +174,11 @@ class Admin(commands.GroupCog, name="admin"):
     @app_commands.command(name='resumen_general', description="Muestra el resumen de horas de todos los practicantes")
     async def resumen_general(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        query = "SELECT * FROM resumen_practicantes ORDER BY nombre_completo ASC"
+        query = """
+        SELECT Nombre_Completo AS nombre_completo, Horas_Base AS horas_base,
+               Horas_Bot AS horas_bot, Total_Acumulado AS total_acumulado
+        FROM resumen_practicantes ORDER BY Nombre_Completo ASC
+        """
         res = await db.fetch_all(query)
         
         if not res: return await interaction.followup.send("No hay datos.", ephemeral=True)
@@ -177,17 +196,53 @@ class Admin(commands.GroupCog, name="admin"):
             
         await interaction.followup.send(embed=embed, ephemeral=True)
 
+    @app_commands.command(name='reconstruir_totales', description="Recalcula desde cero las horas acumuladas de todos los practicantes")
+    async def reconstruir_totales(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        try:
+            await db.reconstruir_totales()
+            utils.marcar_cambio_asistencia()
+            await interaction.followup.send("✅ Totales de horas reconstruidos.", ephemeral=True)
+        except Exception as e:
+            await interaction.followup.send(f"❌ Error: {e}", ephemeral=True)
+
     @app_commands.command(name='sincronizar', description="Fuerza la sincronización con Google Sheets")
-    async def sincronizar(self, interaction: discord.Interaction):
+    @app_commands.describe(completo="Reconstruir 'Reporte Detallado' desde cero en lugar de actualizarlo")
+    async def sincronizar(self, interaction: discord.Interaction, completo: bool = False):
         await interaction.response.defer(ephemeral=True)
-        from google_sheets import sync_practicantes_to_db, export_report_to_sheet
+        from google_sheets import sync_practicantes_to_db, ejecutar_etapas
         try:
-            await sync_practicantes_to_db()
-            await export_report_to_sheet()
-            await interaction.followup.send("✅ Sincronización con Google Sheets completada.", ephemeral=True)
+            practicantes_ok = await sync_practicantes_to_db(forzar=True) is not False
+            resultados = await ejecutar_etapas(completo=completo)
+
+            problemas = []
+            if not practicantes_ok:
+                problemas.append("• No se pudieron leer los practicantes desde Sheets.")
+            if not resultados:
+                problemas.append("• No se exportó ningún reporte (¿faltan las credenciales?).")
+            problemas += [f"• '{nombre}' falló." for nombre, ok in resultados.items() if ok is False]
+            problemas += [f"• '{nombre}' se omitió (ya estaba en curso)." for nombre, ok in resultados.items() if ok is None]
+
+            if problemas:
+                await interaction.followup.send(
+                    "⚠️ Sincronización con Google Sheets incompleta:\n" + "\n".join(problemas), ephemeral=True
+                )
+            else:
+                await interaction.followup.send("✅ Sincronización con Google Sheets completada.", ephemeral=True)
         except Exception as e:
             await interaction.followup.send(f"❌ Error: {e}", ephemeral=True)
 
+    @app_commands.command(name='canal_asistencia', description="Define el canal de asistencia de este servidor")
+    async def canal_asistencia(self, interaction: discord.Interaction, canal: discord.TextChannel):
+        await interaction.response.defer(ephemeral=True)
+        query = """
+        INSERT INTO configuracion_servidor (guild_id, canal_asistencia_id) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE canal_asistencia_id = VALUES(canal_asistencia_id)
+        """
+        await db.execute_query(query, (interaction.guild.id, canal.id))
+        await utils.recargar_config_servidores(self.bot)
+        await interaction.followup.send(f"✅ Canal de asistencia configurado: {canal.mention}.", ephemeral=True)
+
     @app_commands.command(name='agregar_equipo', description="Agrega a un miembro al equipo de desarrollo")
     async def agregar_equipo(self, interaction: discord.Interaction, usuario: discord.User, rol: str = "Developer"):
         await interaction.response.defer(ephemeral=True)
@@ -3,12 +3,15 @@
 import discord
 from discord import app_commands, Embed, Color
 from discord.ext import commands
-from utils import obtener_practicante, verificar_entrada, obtener_estado_asistencia, canal_permitido
+from utils import (
+    obtener_practicante, obtener_estado_asistencia, canal_permitido,
+    registrar_entrada, registrar_salida, ResultadoEntrada, enviar_no_registrado
+)
 from datetime import datetime, time, timedelta
 import database as db
 import logging
 
-from bot.config.constants import HORARIO_ENTRADA_INICIO, HORARIO_ENTRADA_FIN, HORA_LIMITE_TARDANZA
+from bot.config.constants import HORARIO_ENTRADA_INICIO, HORARIO_ENTRADA_FIN, HORA_LIMITE_TARDANZA, HORARIO_SALIDA_MINIMA
 
 class Asistencia(commands.GroupCog, name="asistencia"):
     """Cog para gestionar comandos de asistencia"""
@@ -38,10 +41,6 @@ class Asistencia(commands.GroupCog, name="asistencia"):
         discord_id = interaction.user.id
         nombre_usuario = interaction.user.mention
         logging.info(f'Usuario {interaction.user.display_name} está intentando registrar entrada.')
-        practicante_id = await obtener_practicante(interaction, discord_id)
-        if not practicante_id:
-            logging.warning(f'Practicante no encontrado para el usuario {interaction.user.display_name}.')
-            return
 
         fecha_actual = datetime.now(LIMA_TZ).date()
         hora_actual = datetime.now(LIMA_TZ).time()
@@ -62,17 +61,7 @@ class Asistencia(commands.GroupCog, name="asistencia"):
             )
             return
 
-        asistencia_existente = await verificar_entrada(practicante_id, fecha_actual)
-        
-        # Si ya existe una entrada para hoy, informar al usuario
-        if asistencia_existente:
-            await interaction.followup.send(
-                f"{nombre_usuario}, ya has registrado tu entrada el día de hoy.",
-                ephemeral=True
-            )
-            return
-
-        # Determinar estado de asistencia
+        # Determinar estado de asistencia (catálogo en memoria)
         if hora_actual > HORA_LIMITE_TARDANZA:
             estado_id = await obtener_estado_asistencia('Tardanza')
             mensaje = f"{nombre_usuario}, se ha registrado tu entrada a las {hora_actual.strftime('%H:%M')} con tardanza."
@@ -86,12 +75,23 @@ class Asistencia(commands.GroupCog, name="asistencia"):
                 ephemeral=True
             )
             return
-            
-        query_insert_asistencia = """
-        INSERT INTO asistencia (practicante_id, fecha, hora_entrada, estado_id)
-        VALUES (%s, %s, %s, %s)
-        """
-        await db.execute_query(query_insert_asistencia, (practicante_id, fecha_actual, hora_actual, estado_id))
+
+        # Un solo INSERT: resuelve el practicante y detecta duplicados por unique_asistencia_dia
+        resultado = await registrar_entrada(discord_id, fecha_actual, hora_actual, estado_id)
+
+        if resultado is ResultadoEntrada.NO_REGISTRADO:
+            logging.warning(f'Practicante no encontrado para el usuario {interaction.user.display_name}.')
+            await enviar_no_registrado(interaction)
+            return
+
+        # Si ya existe una entrada para hoy, informar al usuario
+        if resultado is ResultadoEntrada.DUPLICADA:
+            await interaction.followup.send(
+                f"{nombre_usuario}, ya has registrado tu entrada el día de hoy.",
+                ephemeral=True
+            )
+            return
+
         logging.info(f'Entrada registrada para el usuario {interaction.user.display_name}.')
         await interaction.followup.send(mensaje, ephemeral=True)
 
@@ -122,30 +122,31 @@ class Asistencia(commands.GroupCog, name="asistencia"):
             return
 
         fecha_actual = datetime.now(LIMA_TZ).date()
-        query_asistencia = "SELECT id, hora_salida, hora_entrada FROM asistencia WHERE practicante_id = %s AND fecha = %s"
-        asistencia = await db.fetch_one(query_asistencia, (practicante_id, fecha_actual))
-        
-        if not asistencia:
-            await interaction.followup.send(
-                f"{nombre_usuario}, no has registrado tu entrada el día de hoy.",
-                ephemeral=True
-            )
-            return
+        hora_actual = datetime.now(LIMA_TZ).time().replace(microsecond=0)
+        hora_limite_practicas = HORARIO_SALIDA_MINIMA
 
-        if asistencia['hora_salida']:
-            await interaction.followup.send(
-                f"{nombre_usuario}, ya has registrado tu salida el día de hoy.",
-                ephemeral=True
-            )
+        # Un solo UPDATE condicional: calcula horas_extra y el tope de 14:30 en la BD
+        registrada = await registrar_salida(practicante_id, fecha_actual, hora_actual, hora_limite_practicas)
+
+        if not registrada:
+            # Solo en el camino de error averiguamos el motivo
+            query_asistencia = "SELECT hora_salida FROM asistencia WHERE practicante_id = %s AND fecha = %s"
+            asistencia = await db.fetch_one(query_asistencia, (practicante_id, fecha_actual))
+            if not asistencia:
+                await interaction.followup.send(
+                    f"{nombre_usuario}, no has registrado tu entrada el día de hoy.",
+                    ephemeral=True
+                )
+            else:
+                await interaction.followup.send(
+                    f"{nombre_usuario}, ya has registrado tu salida el día de hoy.",
+                    ephemeral=True
+                )
             return
 
-        hora_actual = datetime.now(LIMA_TZ).time()
-        hora_limite_practicas = time(14, 30)
-        
         mensaje_extra = ""
-        horas_extra_str = "00:00:00"
         
-        # Lógica Anti-Farming: Soft Cap a las 14:30
+        # Lógica Anti-Farming: Soft Cap a las 14:30 (solo para el mensaje, la BD ya aplicó el tope)
         if hora_actual > hora_limite_practicas:
             # Calcular horas extra (desde las 14:30 hasta la hora real de salida)
             dt_actual = datetime.combine(fecha_actual, hora_actual)
@@ -157,10 +158,6 @@ class Asistencia(commands.GroupCog, name="asistencia"):
             hours, remainder = divmod(total_seconds, 3600)
             minutes, seconds = divmod(remainder, 60)
             horas_extra_display = f"{hours} horas, {minutes} minutos y {seconds} segundos"
-            horas_extra_str = f"{hours:02}:{minutes:02}:{seconds:02}"
-
-            # La hora oficial de salida se marca a las 14:30
-            hora_salida_db = hora_limite_practicas
             
             mensaje_extra = (
                 f"\n\n⚠️ **AntiFarming: Salida fuera de horas de práctica detectada** ⚠️\n"
@@ -170,16 +167,9 @@ class Asistencia(commands.GroupCog, name="asistencia"):
                 f"Caso contrario, las horas no se verán reflejadas en tu conteo."
             )
             logging.warning(f"Anti-Farming triggered for {interaction.user.display_name}: {horas_extra_display} extra.")
-        else:
-            # Salida normal dentro del horario
-            hora_salida_db = hora_actual
 
         if hora_actual < time(14, 0):
-            # Salida anticipada: registrar y advertir
-            # Nota: Si es anticipada (antes de las 14:00), no hay horas extra
-            query_update_salida = "UPDATE asistencia SET hora_salida = %s, horas_extra = %s WHERE id = %s"
-            await db.execute_query(query_update_salida, (hora_salida_db, '00:00:00', asistencia['id']))
-            
+            # Salida anticipada: advertir (antes de las 14:00 no hay horas extra)
             logging.warning(f'Salida anticipada registrada para el usuario {interaction.user.display_name}.')
             
             mensaje_alerta = (
@@ -190,9 +180,6 @@ class Asistencia(commands.GroupCog, name="asistencia"):
             await interaction.followup.send(mensaje_alerta, ephemeral=True)
         else:
             # Salida normal (o post 14:30)
-            query_update_salida = "UPDATE asistencia SET hora_salida = %s, horas_extra = %s WHERE id = %s"
-            await db.execute_query(query_update_salida, (hora_salida_db, horas_extra_str, asistencia['id']))
-            
             logging.info(f'Salida registrada para el usuario {interaction.user.display_name}.')
             await interaction.followup.send(
                 f"✅ {nombre_usuario}, se ha registrado tu salida a las **{hora_actual.strftime('%H:%M')}**.{mensaje_extra}",
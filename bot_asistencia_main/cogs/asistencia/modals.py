@@ -3,7 +3,7 @@
 import database as db
 import discord
 from discord import TextStyle, ui
-from utils import obtener_estado_asistencia
+from utils import obtener_estado_asistencia, marcar_cambio_asistencia
 
 
 class SalidaAnticipadaModal(ui.Modal, title="Salida Anticipada"):
@@ -34,10 +34,14 @@ class SalidaAnticipadaModal(ui.Modal, title="Salida Anticipada"):
             SET hora_salida = %s, estado_id = %s, motivo = %s 
             WHERE id = %s
         """
-        await db.execute_query(
-            query_update_salida,
-            (self.hora_actual, estado_id, motivo_guardado, self.asistencia['id'])
-        )
+        # practicante_totales se recalcula en la misma transacción (la fila de
+        # asistencia no siempre trae practicante_id, se resuelve por su id)
+        await db.execute_batch([
+            (query_update_salida, (self.hora_actual, estado_id, motivo_guardado, self.asistencia['id'])),
+            (db.sql_recalcular_totales("p.id = (SELECT practicante_id FROM asistencia WHERE id = %s)"),
+             (self.asistencia['id'],)),
+        ])
+        marcar_cambio_asistencia()
 
         await interaction.response.send_message(
             f"{self.nombre_usuario}, tu salida anticipada ha sido registrada con éxito.",
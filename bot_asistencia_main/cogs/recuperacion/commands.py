@@ -3,7 +3,7 @@
 import discord
 from discord import app_commands, Embed, Color
 from discord.ext import commands
-from utils import obtener_practicante, canal_permitido, verificar_rol_permitido, verificar_recuperacion
+from utils import obtener_practicante, canal_permitido, verificar_rol_permitido, verificar_recuperacion, marcar_cambio_asistencia
 from datetime import datetime, time, timedelta
 import database as db
 import logging
@@ -89,6 +89,7 @@ class Recuperacion(commands.Cog):
         VALUES (%s, %s, %s)
         """
         await db.execute_query(query_insert_recuperacion, (practicante_id, fecha_actual, hora_actual))
+        marcar_cambio_asistencia()
         logging.info(f'Recuperación registrada para el usuario {interaction.user.display_name}.')
 
         # Crear embed de confirmación
@@ -128,6 +129,7 @@ class Recuperacion(commands.Cog):
 
         # Actualizar salida
         await db.execute_query("UPDATE asistencia_recuperacion SET hora_salida=%s WHERE id=%s", (hora_actual, rec['id']))
+        marcar_cambio_asistencia()
         
         # Calcular duración
         inicio = datetime.combine(fecha_actual, (datetime.min + rec['hora_entrada']).time())
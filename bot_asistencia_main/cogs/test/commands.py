@@ -7,7 +7,7 @@ from datetime import datetime
 from zoneinfo import ZoneInfo
 import database as db
 import logging
-from utils import obtener_practicante, obtener_estado_asistencia, LIMA_TZ
+from utils import obtener_practicante, obtener_estado_asistencia, marcar_cambio_asistencia, LIMA_TZ
 
 @app_commands.default_permissions(administrator=True)
 class Test(commands.GroupCog, name="test"):
@@ -50,12 +50,20 @@ class Test(commands.GroupCog, name="test"):
         if accion == "entrada":
             estado_id = await obtener_estado_asistencia(estado)
             query = "INSERT INTO asistencia (practicante_id, fecha, hora_entrada, estado_id) VALUES (%s, %s, %s, %s) ON DUPLICATE KEY UPDATE hora_entrada = VALUES(hora_entrada), estado_id = VALUES(estado_id)"
-            await db.execute_query(query, (practicante_id, fecha_actual, hora_actual, estado_id))
+            await db.execute_batch([
+                (query, (practicante_id, fecha_actual, hora_actual, estado_id)),
+                (db.sql_recalcular_totales("p.id = %s"), (practicante_id,)),
+            ])
+            marcar_cambio_asistencia()
             await interaction.followup.send(f"✅ [TEST] Entrada registrada para <@{target_id}> a las {hora_actual.strftime('%H:%M')}.", ephemeral=True)
         
         else: # salida
             query = "UPDATE asistencia SET hora_salida = %s WHERE practicante_id = %s AND fecha = %s AND hora_salida IS NULL"
-            result = await db.execute_query(query, (hora_actual, practicante_id, fecha_actual))
+            await db.execute_batch([
+                (query, (hora_actual, practicante_id, fecha_actual)),
+                (db.sql_recalcular_totales("p.id = %s"), (practicante_id,)),
+            ])
+            marcar_cambio_asistencia()
             await interaction.followup.send(f"✅ [TEST] Salida registrada para <@{target_id}> a las {hora_actual.strftime('%H:%M')}.", ephemeral=True)
 
 async def setup(bot):
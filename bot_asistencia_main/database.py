@@ -1,263 +1,292 @@
-import os
-import aiomysql
-import ssl
-from dotenv import load_dotenv
-from typing import Optional, Union, Tuple, Dict, Any, List
-from contextlib import asynccontextmanager
-from collections.abc import AsyncIterator
+"""
+Acceso a datos del bot.
+Fachada de funciones sobre el único pool de bot.core.database.Database
+(SSL, pool, instrumentación), más las consultas propias del esquema.
+"""
 
-# Evitar import circular si es posible, pero mantenemos si es necesario o eliminamos si no se usa
-# import database as db  <-- Esto parece redundante si estams en database.py, lo comento.
-
-load_dotenv()
+import datetime
+import logging
+from typing import Optional, Tuple, Dict, Any, List
+from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator, Sequence
 
-def get_ssl_context():
-    if os.getenv("DB_USE_SSL") == "True":
-        ctx = ssl.create_default_context(cafile=os.getenv("SSL_CA_PATH", "isrgrootx1.pem"))
-        # TiDB Cloud requiere SSL pero a veces hay temas de compatibilidad con check_hostname
-        # Ajustamos según sea necesario. Para la mayoría de nubes, esto es suficiente.
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_REQUIRED
-        return ctx
-    return None
+import aiomysql
 
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASSWORD"),
-    "db": os.getenv("DB_NAME"),
-    "port": int(os.getenv("DB_PORT", 3306)), # MySQL usa 3306, TiDB usa 4000
-    "autocommit": False,
-    "ssl": get_ssl_context()
-}
+from bot.config.settings import Settings
+from bot.core.database import get_database
+from bot.core.database.connection import Fila, Params
+from bot.core.exceptions.database import DatabaseDuplicateEntryError
 
-# Pool de conexiones global
-_pool: Optional[aiomysql.Pool] = None
+# Nombre histórico usado por utils y los cogs
+DuplicateEntryError = DatabaseDuplicateEntryError
 
 # Inicializar el pool de conexiones
-async def init_db_pool(minsize: int = 1, maxsize: int = 10) -> aiomysql.Pool:
-    global _pool
-    if _pool is None:
-        _pool = await aiomysql.create_pool(minsize=minsize, maxsize=maxsize, **DB_CONFIG)
-    return _pool
+async def init_db_pool(minsize: Optional[int] = None, maxsize: Optional[int] = None) -> aiomysql.Pool:
+    return await get_database().initialize(minsize, maxsize)
 
 # Cerrar el pool de conexiones
 async def close_db_pool() -> None:
-    global _pool
-    if _pool is not None:
-        _pool.close()
-        await _pool.wait_closed()
-        _pool = None
+    await get_database().close()
 
 # Context manager para obtener una conexión del pool
 @asynccontextmanager
 async def get_connection() -> AsyncIterator[aiomysql.Connection]:
-    pool = await init_db_pool()
-    conn = await pool.acquire()
-    try:
+    async with get_database().get_connection() as conn:
         yield conn
-    finally:
-        pool.release(conn)
+
+async def calentar_pool(conexiones: Optional[int] = None) -> int:
+    """Abre y verifica varias conexiones antes de un pico de uso."""
+    return await get_database().warmup(conexiones)
+
+def estado_pool() -> Dict[str, int]:
+    """Conexiones del pool: abiertas, libres, en uso y corrutinas en espera."""
+    return get_database().pool_stats()
+
+async def verificar_reutilizacion_pool(lecturas: int = 5) -> bool:
+    """Comprueba que lecturas repetidas no abran conexiones nuevas."""
+    return await get_database().verificar_reutilizacion(lecturas)
+
+async def ping_pool(timeout: float = 3.0) -> bool:
+    """Comprueba que el pool entregue una conexión viva dentro del timeout."""
+    return await get_database().ping(timeout)
 
 # Funciones para ejecutar consultas
-async def fetch_one(query: str, params: Optional[Union[Tuple, Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
-    async with get_connection() as conn:
-        try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(query, params)
-                return await cursor.fetchone()
-        except aiomysql.Error as e:
-            raise RuntimeError(f"Error ejecutando fetch_one: {e}") from e
-
-async def fetch_all(query: str, params: Optional[Union[Tuple, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
-    async with get_connection() as conn:
+async def fetch_one(query: str, params: Params = None) -> Optional[Fila]:
+    return await get_database().fetch_one(query, params)
+
+async def fetch_all(query: str, params: Params = None) -> List[Fila]:
+    return await get_database().fetch_all(query, params)
+
+async def execute_query(query: str, params: Params = None) -> int:
+    return await get_database().execute(query, params)
+
+async def execute_rowcount(query: str, params: Params = None) -> int:
+    """Igual que execute_query pero retorna las filas afectadas y distingue claves duplicadas."""
+    return await get_database().execute_rowcount(query, params)
+
+def transaction():
+    """
+    Transacción sobre una sola conexión con un único commit:
+        async with db.transaction() as tx:
+            await tx.execute(...)
+    """
+    return get_database().transaction()
+
+async def execute_batch(statements: Sequence[Tuple[str, Params]]) -> List[int]:
+    """
+    Ejecuta varias sentencias en una sola conexión y transacción (un único commit).
+    Retorna las filas afectadas por cada sentencia; distingue claves duplicadas.
+    """
+    return await get_database().execute_batch(statements)
+
+async def bulk_upsert(
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence[Any]],
+    key_column: str,
+    update_columns: Optional[Sequence[str]] = None,
+    chunk_size: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE de varias filas en lotes, dentro de una sola transacción.
+    Retorna cuántas filas se insertaron, actualizaron y quedaron sin cambios.
+    """
+    return await get_database().bulk_upsert(table, columns, rows, key_column, update_columns, chunk_size)
+
+# Recalcula practicante_totales a partir de asistencia (idempotente).
+# filtro: condición sobre practicante p, p. ej. "p.id = %s" o "p.id_discord = %s"; vacío = todos.
+def sql_recalcular_totales(filtro: str = "") -> str:
+    where = f"WHERE {filtro}" if filtro else ""
+    return f"""
+    INSERT INTO practicante_totales (practicante_id, segundos_bot, sesiones, ultima_fecha)
+    SELECT
+        p.id,
+        IFNULL(SUM(CASE WHEN a.hora_salida IS NOT NULL THEN TIME_TO_SEC(TIMEDIFF(a.hora_salida, a.hora_entrada)) END), 0),
+        COUNT(a.hora_salida),
+        MAX(a.fecha)
+    FROM practicante p
+    LEFT JOIN asistencia a ON a.practicante_id = p.id
+    {where}
+    GROUP BY p.id
+    ON DUPLICATE KEY UPDATE
+        segundos_bot = VALUES(segundos_bot),
+        sesiones = VALUES(sesiones),
+        ultima_fecha = VALUES(ultima_fecha)
+    """
+
+async def reconstruir_totales() -> int:
+    """Reconstruye practicante_totales desde cero (comando de reconciliación)."""
+    filas = await execute_batch([
+        ("DELETE FROM practicante_totales", None),
+        (sql_recalcular_totales(), None),
+    ])
+    return filas[1]
+
+# Formatos de fecha aceptados desde Sheets (ISO, como la escribe el bot, o día/mes/año)
+FORMATOS_FECHA = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d-%m-%Y")
+
+def parsear_fecha(valor) -> Optional[datetime.date]:
+    """Convierte una fecha de Sheets a date, o None si no se reconoce el formato."""
+    if isinstance(valor, datetime.date):
+        return valor
+    texto = str(valor).strip()
+    for formato in FORMATOS_FECHA:
         try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(query, params)
-                return list(await cursor.fetchall())
-        except aiomysql.Error as e:
-            raise RuntimeError(f"Error ejecutando fetch_all: {e}") from e
-
-async def execute_query(query: str, params: Optional[Union[Tuple, Dict[str, Any]]] = None) -> int:
-    async with get_connection() as conn:
+            return datetime.datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+async def validar_horas_extra(pares: Sequence[Tuple[int, Any]], chunk_size: Optional[int] = None) -> Dict[Tuple[int, datetime.date], bool]:
+    """
+    Valida en bloque las horas extra (Anti-Farming) de los pares (id_discord, fecha):
+    suma horas_extra a la salida y las deja en cero, en una sola transacción.
+    Las fechas se normalizan a date (se omiten con aviso las que no se reconocen).
+    Retorna por cada par (id_discord, date) si tenía horas pendientes y quedó validado.
+    """
+    normalizados = []
+    for id_discord, fecha in pares:
+        fecha_normalizada = parsear_fecha(fecha)
+        if fecha_normalizada is None:
+            logging.warning(f"⚠️ Fecha no reconocida en validación Anti-Farming (ID {id_discord}): '{fecha}'")
+            continue
+        normalizados.append((int(id_discord), fecha_normalizada))
+    pares = list(dict.fromkeys(normalizados))
+    resultado = {par: False for par in pares}
+    if not pares:
+        return resultado
+
+    chunk_size = chunk_size or Settings.DB_BULK_CHUNK_SIZE
+    async with transaction() as tx:
+        asistencias = []
+        for i in range(0, len(pares), chunk_size):
+            chunk = pares[i:i + chunk_size]
+            # Tabla derivada con los pares (UNION ALL: válido en MySQL, MariaDB y TiDB)
+            valores = " UNION ALL ".join(["SELECT %s AS id_discord, %s AS fecha"] * len(chunk))
+            asistencias += await tx.fetch_all(f"""
+            SELECT v.id_discord, a.fecha, a.id, a.practicante_id
+            FROM ({valores}) v
+            JOIN practicante p ON p.id_discord = v.id_discord
+            JOIN asistencia a ON a.practicante_id = p.id AND a.fecha = v.fecha
+            WHERE a.horas_extra > '00:00:00'
+            FOR UPDATE
+            """, [x for par in chunk for x in par])
+
+        if not asistencias:
+            return resultado
+
+        ids = [row['id'] for row in asistencias]
+        practicantes = sorted({row['practicante_id'] for row in asistencias})
+        await tx.execute(f"""
+        UPDATE asistencia
+        SET hora_salida = ADDTIME(hora_salida, horas_extra),
+            horas_extra = '00:00:00',
+            observaciones = CONCAT(IFNULL(observaciones, ''), '\n[Sistema] Horas validadas mediante Google Sheets.')
+        WHERE id IN ({", ".join(["%s"] * len(ids))}) AND horas_extra > '00:00:00'
+        """, ids)
+        await tx.execute(
+            sql_recalcular_totales(f"p.id IN ({', '.join(['%s'] * len(practicantes))})"), practicantes
+        )
+
+    for row in asistencias:
+        resultado[(int(row['id_discord']), parsear_fecha(row['fecha']))] = True
+    return resultado
+
+# Índices secundarios para los patrones de acceso más frecuentes: (tabla, nombre, columnas)
+INDICES_SECUNDARIOS = [
+    # Salidas pendientes del día (auto_reporte_diario_task) y joins por fecha (reporte_hoy, reporte diario)
+    ("asistencia", "idx_asistencia_fecha_salida", "fecha, hora_salida, hora_entrada, practicante_id"),
+    # Faltas por practicante y estado (cogs/faltas), ordenadas por fecha
+    ("asistencia", "idx_asistencia_practicante_estado", "practicante_id, estado_id, fecha"),
+    # Incidentes Anti-Farming (horas_extra > 0)
+    ("asistencia", "idx_asistencia_horas_extra", "horas_extra, fecha"),
+]
+
+# Consultas calientes para el autodiagnóstico con EXPLAIN: nombre -> (query, params de ejemplo)
+CONSULTAS_CRITICAS = {
+    "salidas_pendientes": (
+        "SELECT COUNT(*) FROM asistencia WHERE fecha = CURDATE() AND hora_entrada IS NOT NULL AND hora_salida IS NULL",
+        None,
+    ),
+    "faltas_practicante": (
+        "SELECT fecha, motivo FROM asistencia WHERE practicante_id = %s AND estado_id = %s ORDER BY fecha DESC LIMIT 5",
+        (0, 0),
+    ),
+    "incidentes_anti_farming": (
+        "SELECT p.id_discord, a.fecha, a.horas_extra FROM asistencia a JOIN practicante p ON a.practicante_id = p.id "
+        "WHERE a.horas_extra > '00:00:00' ORDER BY a.fecha DESC",
+        None,
+    ),
+    "asistencia_del_dia": (
+        "SELECT p.nombre_completo, a.hora_entrada FROM practicante p "
+        "JOIN asistencia a ON p.id = a.practicante_id AND a.fecha = CURDATE()",
+        None,
+    ),
+    "export_incremental": (
+        "SELECT id FROM asistencia WHERE actualizado_en >= NOW()",
+        None,
+    ),
+}
+
+def _tabla_full_scan(fila: Dict[str, Any]) -> Optional[str]:
+    """Tabla recorrida completa en una fila de EXPLAIN (MySQL/MariaDB o TiDB), o None."""
+    if fila.get("type") == "ALL":
+        return fila.get("table")
+    operador = str(fila.get("id", ""))
+    if "TableFullScan" in operador:
+        return str(fila.get("access object", "")).replace("table:", "") or operador
+    return None
+
+async def obtener_estado_bot(clave: str) -> Optional[str]:
+    """Lee un valor persistido en bot_estado (None si no existe)."""
+    fila = await fetch_one("SELECT valor FROM bot_estado WHERE clave = %s", (clave,))
+    return fila['valor'] if fila else None
+
+async def guardar_estado_bot(clave: str, valor: str) -> None:
+    """Guarda (o reemplaza) un valor en bot_estado."""
+    await execute_query("""
+    INSERT INTO bot_estado (clave, valor) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE valor = VALUES(valor)
+    """, (clave, valor))
+
+async def verificar_planes_consultas() -> Dict[str, List[str]]:
+    """
+    Ejecuta EXPLAIN sobre las consultas críticas y registra las que aún
+    recorren 'asistencia' completa. Retorna nombre -> tablas con full scan.
+    """
+    resultado = {}
+    for nombre, (query, params) in CONSULTAS_CRITICAS.items():
         try:
-            async with conn.cursor() as cursor:
-                await cursor.execute(query, params)
-                await conn.commit()
-                return cursor.lastrowid or 0
-        except aiomysql.Error as e:
-            await conn.rollback()
-            raise RuntimeError(f"Error ejecutando execute_query: {e}") from e
+            plan = await fetch_all(f"EXPLAIN {query}", params)
+        except RuntimeError as e:
+            logging.warning(f"⚠️ No se pudo ejecutar EXPLAIN para '{nombre}': {e}")
+            continue
+        tablas = [t for t in (_tabla_full_scan(fila) for fila in plan) if t in ("a", "asistencia")]
+        if tablas:
+            resultado[nombre] = tablas
+            logging.warning(f"🐢 Consulta '{nombre}' sigue haciendo full scan sobre asistencia.")
+    return resultado
 
 async def ensure_db_setup():
-    """Verifica y crea las tablas necesarias y datos iniciales."""
-    import logging
+    """Aplica las migraciones pendientes y carga los datos iniciales en memoria."""
+    from migrations import aplicar_migraciones
+    from utils import recargar_estados_asistencia
     logging.info("Verificando integridad de la base de datos...")
-    
-    # 1. Tabla practicante (Esquema Simplificado: Solo ID, Nombre Completo, Horas Base)
-    # Nota: Eliminamos correo, semestre, estado, is_active, apellido.
-    await execute_query("""
-    CREATE TABLE IF NOT EXISTS practicante (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        id_discord BIGINT NOT NULL UNIQUE,
-        nombre_completo VARCHAR(255) NOT NULL,
-        horas_base TIME DEFAULT '00:00:00'
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-    """)
-
-    # 2. Tabla estado_asistencia
-    await execute_query("""
-    CREATE TABLE IF NOT EXISTS estado_asistencia (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        estado VARCHAR(50) NOT NULL UNIQUE
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-    """)
 
-    # 3. Insertar estados base
-    for estado in ['Presente', 'Tardanza', 'Falta Injustificada', 'Falta Recuperada', 'Permiso']:
-        await execute_query("INSERT IGNORE INTO estado_asistencia (estado) VALUES (%s)", (estado,))
+    aplicadas = await aplicar_migraciones()
+    if aplicadas:
+        logging.info(f"Esquema actualizado a la versión {aplicadas[-1].version} ({len(aplicadas)} migraciones).")
+        # Autodiagnóstico de planes solo cuando cambió el esquema
+        await verificar_planes_consultas()
+    else:
+        logging.info("Esquema al día, sin migraciones pendientes.")
 
-    # 4. Tabla asistencia
-    await execute_query("""
-    CREATE TABLE IF NOT EXISTS asistencia (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        practicante_id INT NOT NULL,
-        estado_id INT NOT NULL,
-        fecha DATE NOT NULL,
-        hora_entrada TIME,
-        hora_salida TIME,
-        horas_extra TIME DEFAULT '00:00:00',
-        observaciones TEXT,
-        motivo VARCHAR(255),
-        FOREIGN KEY (practicante_id) REFERENCES practicante(id) ON DELETE CASCADE,
-        FOREIGN KEY (estado_id) REFERENCES estado_asistencia(id),
-        UNIQUE KEY unique_asistencia_dia (practicante_id, fecha)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-    """)
-
-    # 5. Tabla asistencia_recuperacion
-    await execute_query("""
-    CREATE TABLE IF NOT EXISTS asistencia_recuperacion (
-        id INT AUTO_INCREMENT PRIMARY KEY,
-        practicante_id INT NOT NULL,
-        fecha_recuperacion DATE NOT NULL,
-        hora_entrada TIME NOT NULL,
-        hora_salida TIME NULL,
-        motivo TEXT NULL,
-        estado VARCHAR(20) DEFAULT 'Pendiente',
-        FOREIGN KEY (practicante_id) REFERENCES practicante(id) ON DELETE CASCADE,
-        UNIQUE KEY unique_recuperacion_dia (practicante_id, fecha_recuperacion)
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-    """)
-
-    # 6. Tabla para rastrear reportes diarios enviados
-    await execute_query("""
-    CREATE TABLE IF NOT EXISTS reportes_enviados (
-        fecha DATE PRIMARY KEY,
-        enviado_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-    """)
+    # Las lecturas deben reutilizar conexiones (si no, cada SELECT abre una nueva con TLS)
+    if not await verificar_reutilizacion_pool():
+        logging.warning(f"⚠️ El pool no reutiliza conexiones entre lecturas: {estado_pool()}")
+
+    # Cargar el catálogo de estados en memoria
+    estados = await recargar_estados_asistencia()
+    logging.info(f"Catálogo de estados cargado ({len(estados)} estados).")
 
-    # 7. Tabla de configuración por servidor
-    await execute_query("""
-    CREATE TABLE IF NOT EXISTS configuracion_servidor (
-        guild_id BIGINT PRIMARY KEY,
-        canal_asistencia_id BIGINT NULL,
-        canal_reportes_id BIGINT NULL,
-        usuarios_mencion_reporte TEXT NULL, -- IDs separados por comas
-        mensaje_bienvenida TEXT NULL
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-    """)
-
-    # 8. Tabla de administradores (Equipo de Desarrollo)
-    await execute_query("""
-    CREATE TABLE IF NOT EXISTS bot_admins (
-        discord_id BIGINT PRIMARY KEY,
-        nombre_referencia VARCHAR(255),
-        rol VARCHAR(100) DEFAULT 'Developer'
-    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-    """)
-
-    # Insertar equipo inicial si no existe
-    query_admin = "INSERT IGNORE INTO bot_admins (discord_id, nombre_referencia, rol) VALUES (%s, %s, %s)"
-    admins = [
-        (615932763161362636, 'Renso Mamani', 'Dev Principal'),
-        (824692049084678144, 'Wilber Peralta', 'Product Owner'),
-        (1395195164779347988, 'Jordy', 'Developer')
-    ]
-    for admin_data in admins:
-        await execute_query(query_admin, admin_data)
-
-    # 7. Vista para Reporte Excel (Incluye Total: Horas Base + Horas Bot)
-    await execute_query("""
-    CREATE OR REPLACE VIEW reporte_asistencia AS
-    SELECT 
-        a.id AS Asistencia_ID,
-        p.id_discord AS ID_Discord,
-        p.nombre_completo AS Nombre_Completo,
-        a.fecha AS Fecha,
-        a.hora_entrada AS Entrada,
-        a.hora_salida AS Salida,
-        ea.estado AS Estado,
-        
-        -- Horas trabajadas en esta sesión específica
-        TIMEDIFF(a.hora_salida, a.hora_entrada) AS Horas_Sesion,
-        
-        -- Horas Base fijas desde Excel
-        p.horas_base AS Horas_Base,
-
-        -- Total Horas Bot (histórico hasta hoy)
-        (
-            SELECT SEC_TO_TIME(SUM(TIME_TO_SEC(TIMEDIFF(a2.hora_salida, a2.hora_entrada))))
-            FROM asistencia a2
-            WHERE a2.practicante_id = p.id AND a2.hora_salida IS NOT NULL
-        ) AS Total_Horas_Bot,
-
-        -- GRAN TOTAL (Base + Bot)
-        ADDTIME(
-            IFNULL(p.horas_base, '00:00:00'),
-            IFNULL((
-                SELECT SEC_TO_TIME(SUM(TIME_TO_SEC(TIMEDIFF(a3.hora_salida, a3.hora_entrada))))
-                FROM asistencia a3
-                WHERE a3.practicante_id = p.id AND a3.hora_salida IS NOT NULL
-            ), '00:00:00')
-        ) AS Gran_Total_Acumulado
-
-    FROM asistencia a
-    JOIN practicante p ON a.practicante_id = p.id
-    JOIN estado_asistencia ea ON a.estado_id = ea.id;
-    """)
-    
-
-    # 7. Vista simplificada para consultas rápidas (Resumen por Practicante)
-    await execute_query("""
-    CREATE OR REPLACE VIEW resumen_practicantes AS
-    SELECT 
-        p.id,
-        p.id_discord AS ID_Discord,
-        p.nombre_completo AS Nombre_Completo,
-        p.horas_base AS Horas_Base,
-        
-        -- Total Horas Bot (todas las sesiones completadas)
-        IFNULL(
-            (SELECT SEC_TO_TIME(SUM(TIME_TO_SEC(TIMEDIFF(a.hora_salida, a.hora_entrada))))
-             FROM asistencia a
-             WHERE a.practicante_id = p.id AND a.hora_salida IS NOT NULL),
-            '00:00:00'
-        ) AS Horas_Bot,
-        
-        -- Gran Total (Base + Bot)
-        ADDTIME(
-            IFNULL(p.horas_base, '00:00:00'),
-            IFNULL(
-                (SELECT SEC_TO_TIME(SUM(TIME_TO_SEC(TIMEDIFF(a.hora_salida, a.hora_entrada))))
-                 FROM asistencia a
-                 WHERE a.practicante_id = p.id AND a.hora_salida IS NOT NULL),
-                '00:00:00'
-            )
-        ) AS Total_Acumulado
-    FROM practicante p
-    ORDER BY Total_Acumulado DESC;
-    """)
-    
     logging.info("Base de datos inicializada Correctamente (Esquema Simplificado).")
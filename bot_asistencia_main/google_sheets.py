@@ -1,7 +1,17 @@
 import gspread
+from google.auth.transport.requests import Request
 from google.oauth2.service_account import Credentials
+import asyncio
+import datetime
+import functools
+import hashlib
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bot.config.settings import Settings
+from bot.core.metrics import metrics
 
 # Configuración
 SCOPES = [
@@ -12,6 +22,117 @@ CREDENTIALS_FILE = '/app/credentials.json'  # Ruta en el contenedor Docker
 # Si estás probando localmente fuera de Docker, podrías necesitar ajustar la ruta
 # CREDENTIALS_FILE = 'credentials.json'
 SHEET_NAME_ENV = 'GOOGLE_SHEET_NAME' # Nombre de la hoja en .env
+SHEET_ID_ENV = 'GOOGLE_SHEET_ID' # Opcional: ID del Spreadsheet (evita la búsqueda por nombre en Drive)
+
+# gspread es síncrono: todas sus llamadas van a este pool acotado para no congelar el loop del bot
+_sheets_executor = ThreadPoolExecutor(max_workers=Settings.SHEETS_MAX_WORKERS, thread_name_prefix="sheets")
+
+def _medir_etapa(etapa):
+    """Registra en las métricas la duración y el resultado (False = fallo) de una etapa de Sheets."""
+    def decorador(func):
+        @functools.wraps(func)
+        async def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            ok = False
+            try:
+                resultado = await func(*args, **kwargs)
+                ok = resultado is not False
+                return resultado
+            finally:
+                metrics.registrar_sheets(etapa, time.perf_counter() - inicio, ok)
+        return envoltura
+    return decorador
+
+async def _en_hilo(func, *args, timeout=None, **kwargs):
+    """Ejecuta una llamada bloqueante de gspread en el pool de Sheets con timeout."""
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(
+        loop.run_in_executor(_sheets_executor, functools.partial(func, *args, **kwargs)),
+        timeout or Settings.SHEETS_CALL_TIMEOUT
+    )
+
+class SesionSheets:
+    """
+    Sesión de Google Sheets reutilizable entre ciclos de sincronización.
+    Mantiene las credenciales, el cliente autorizado y los Spreadsheet/Worksheet
+    ya resueltos, y solo renueva el token cuando está por expirar.
+    """
+
+    MARGEN_REFRESCO = datetime.timedelta(minutes=5)
+
+    def __init__(self):
+        self._creds = None
+        self._client = None
+        self._ids_por_nombre = {}
+        self._spreadsheets = {}
+        self._worksheets = {}
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def ruta_credenciales():
+        """Ruta del archivo de credenciales (Docker o local), o None si no existe."""
+        for ruta in (CREDENTIALS_FILE, 'credentials.json'):
+            if os.path.exists(ruta):
+                return ruta
+        return None
+
+    def _token_por_expirar(self):
+        if not self._creds.token or self._creds.expiry is None:
+            return True
+        ahora_utc = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return self._creds.expiry - self.MARGEN_REFRESCO <= ahora_utc
+
+    async def cliente(self):
+        """Cliente gspread autorizado, o None si no hay credenciales."""
+        async with self._lock:
+            if self._creds is None:
+                ruta = self.ruta_credenciales()
+                if ruta is None:
+                    return None
+                self._creds = await _en_hilo(Credentials.from_service_account_file, ruta, scopes=SCOPES)
+            if self._client is None:
+                self._client = await _en_hilo(gspread.authorize, self._creds)
+                self._client.set_timeout(Settings.SHEETS_CALL_TIMEOUT)
+
+            if self._token_por_expirar():
+                await _en_hilo(self._creds.refresh, Request())
+            return self._client
+
+    async def spreadsheet(self, nombre):
+        """Spreadsheet por ID (GOOGLE_SHEET_ID) o por nombre, resuelto una sola vez."""
+        client = await self.cliente()
+        if client is None:
+            return None
+
+        sheet_id = os.getenv(SHEET_ID_ENV) or self._ids_por_nombre.get(nombre)
+        if sheet_id and sheet_id in self._spreadsheets:
+            return self._spreadsheets[sheet_id]
+
+        if sheet_id:
+            spreadsheet = await _en_hilo(client.open_by_key, sheet_id)
+        else:
+            spreadsheet = await _en_hilo(client.open, nombre)
+        self._ids_por_nombre[nombre] = spreadsheet.id
+        self._spreadsheets[spreadsheet.id] = spreadsheet
+        return spreadsheet
+
+    async def worksheet(self, spreadsheet, titulo, rows="100", cols="6"):
+        """Obtiene (o crea) una pestaña y la recuerda para los siguientes ciclos."""
+        clave = (spreadsheet.id, titulo)
+        if clave not in self._worksheets:
+            try:
+                self._worksheets[clave] = await _en_hilo(spreadsheet.worksheet, titulo)
+            except gspread.WorksheetNotFound:
+                self._worksheets[clave] = await _en_hilo(spreadsheet.add_worksheet, title=titulo, rows=rows, cols=cols)
+        return self._worksheets[clave]
+
+    def invalidar(self):
+        """Descarta los handles (p. ej. tras un error de API); las credenciales se conservan."""
+        self._client = None
+        self._spreadsheets.clear()
+        self._worksheets.clear()
+
+_sesion = SesionSheets()
 
 def format_duration(td_str):
     """
@@ -51,39 +172,73 @@ def get_spanish_date(date_obj):
 
     return f"{day_name} {date_obj.day} {month_name} {date_obj.year}"
 
-def get_practicantes_from_sheet():
+# Huella de la última sincronización de practicantes (Sheets -> BD)
+_estado_sync = {
+    "modified_time": None,         # modifiedTime del Spreadsheet ya procesado
+    "modified_time_leido": None,   # modifiedTime de la lectura en curso
+    "snapshot": None,              # hash de las huellas por fila (id_discord -> contenido)
+}
+
+def _normalizar_horas(valor):
+    """Convierte horas base (timedelta de la BD o 'H:MM:SS' del Excel) a segundos."""
+    if valor is None:
+        return 0
+    if isinstance(valor, datetime.timedelta):
+        return int(valor.total_seconds())
+    try:
+        partes = [int(float(x)) for x in str(valor).split(':')]
+    except ValueError:
+        return 0
+    partes += [0] * (3 - len(partes))
+    h, m, s = partes[:3]
+    return h * 3600 + m * 60 + s
+
+def _hash_fila(nombre_completo, horas_base):
+    """Huella del contenido sincronizable de un practicante."""
+    contenido = f"{nombre_completo}|{_normalizar_horas(horas_base)}"
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()
+
+async def _modified_time(spreadsheet):
+    """modifiedTime del Spreadsheet según Drive, o None si no se pudo leer."""
+    try:
+        return await _en_hilo(spreadsheet.get_lastUpdateTime)
+    except Exception as e:
+        logging.debug(f"No se pudo leer modifiedTime del Spreadsheet: {e}")
+        return None
+
+async def get_practicantes_from_sheet(ultimo_modified_time=None):
     """
     Lee la lista de practicantes desde Google Sheets.
-    Retorna una lista de diccionarios con 'id_discord', 'nombre', 'apellido'.
+    Retorna una lista de diccionarios con 'id_discord', 'nombre_completo', 'horas_base',
+    o None si el Spreadsheet no se modificó desde ultimo_modified_time.
     """
     sheet_name = os.getenv(SHEET_NAME_ENV, 'Bot_de_asistencia_2026')
 
     # Verificar si existe el archivo de credenciales
-    if not os.path.exists(CREDENTIALS_FILE) and not os.path.exists('credentials.json'):
-         # Fallback para pruebas locales si no está en /app
-        if os.path.exists('credentials.json'):
-            creds_path = 'credentials.json'
-        else:
-            logging.warning(f"⚠️ No se encontró {CREDENTIALS_FILE}. La sincronización con Google Sheets no funcionará.")
-            return []
-    else:
-        creds_path = CREDENTIALS_FILE if os.path.exists(CREDENTIALS_FILE) else 'credentials.json'
+    if SesionSheets.ruta_credenciales() is None:
+        logging.warning(f"⚠️ No se encontró {CREDENTIALS_FILE}. La sincronización con Google Sheets no funcionará.")
+        return []
 
     try:
-        creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
-        client = gspread.authorize(creds)
-
-        # Abrir la hoja de cálculo
+        # Abrir la hoja de cálculo (sesión reutilizada entre ciclos)
         try:
-            sheet = client.open(sheet_name).sheet1
+            spreadsheet = await _sesion.spreadsheet(sheet_name)
         except gspread.SpreadsheetNotFound:
             logging.error(f"❌ No se encontró la hoja de cálculo: '{sheet_name}'. Verifica el nombre.")
             return []
 
+        # Si el Spreadsheet no cambió desde la última lectura, no descargar ni parsear nada
+        modified_time = await _modified_time(spreadsheet)
+        _estado_sync["modified_time_leido"] = modified_time
+        if modified_time and modified_time == ultimo_modified_time:
+            return None
+
+        sheet = await _en_hilo(spreadsheet.get_worksheet, 0)
+
         # Obtener todos los registros (asumiendo fila 1 = encabezados)
         # Se espera: Timestamp, ID Discord, Nombre Completo
         # Indices (0-based): 0=Timestamp, 1=ID Discord, 2=Nombre Completo
-        rows = sheet.get_all_values()
+        rows = await _en_hilo(sheet.get_all_values)
 
         if len(rows) < 2:
             return [] # Hoja vacía
@@ -171,244 +326,618 @@ def get_practicantes_from_sheet():
         return practicantes
 
     except Exception as e:
+        _sesion.invalidar()
         logging.error(f"❌ Error crítico en sync Google Sheets: {e}")
         return []
 
-async def sync_practicantes_to_db():
+def olvidar_sync_practicantes():
     """
-    Función principal para sincronizar datos de Sheets hacia la BD.
-    Sincroniza SOLO ID, Nombre Completo y Horas Base.
+    Descarta la huella de la última sincronización para que la próxima relea
+    la hoja completa (p. ej. tras /admin eliminar_practicante, que borra filas
+    que siguen en el Excel y deben volver a crearse como antes).
     """
-    import database as db
-
-    practicantes = get_practicantes_from_sheet()
-
-    if not practicantes:
-        return
-
-    for p in practicantes:
-        # Insertar o actualizar con esquema simplificado
-        # Se asume que la tabla 'practicante' ha sido actualizada para tener 'nombre_completo'
-        query_insert = """
-        INSERT INTO practicante (id_discord, nombre_completo, horas_base)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE 
-            nombre_completo = VALUES(nombre_completo),
-            horas_base = VALUES(horas_base)
-        """
-
-        await db.execute_query(query_insert, (
-            p['id_discord'], p['nombre_completo'], p['horas_base']
-        ))
-
-    logging.info(f"📥 Sincronización completa (Nombres unificados) desde Sheets.")
+    _estado_sync["modified_time"] = None
+    _estado_sync["snapshot"] = None
 
-async def export_report_to_sheet():
+@_medir_etapa("sync_practicantes")
+async def sync_practicantes_to_db(forzar: bool = False):
     """
-    Lee la vista reporte_asistencia de la BD y la exporta a una nueva pestaña en Google Sheets.
+    Función principal para sincronizar datos de Sheets hacia la BD.
+    Sincroniza SOLO ID, Nombre Completo y Horas Base, y escribe únicamente
+    las filas nuevas o modificadas respecto al estado actual de la BD.
     """
     import database as db
+    from utils import cachear_practicantes, marcar_cambio_asistencia
 
-    # 1. Obtener datos de la base de datos
-    query = "SELECT * FROM reporte_asistencia ORDER BY Fecha DESC, Nombre_Completo ASC"
-    data = await db.fetch_all(query)
+    ultimo = None if forzar else _estado_sync["modified_time"]
+    practicantes = await get_practicantes_from_sheet(ultimo)
 
-    if not data:
-        logging.info("↻ Reporte Sheets: No hay datos para exportar.")
+    if practicantes is None:
+        logging.info("⏩ Sheets sin cambios desde la última sincronización.")
         return
 
-    sheet_name = os.getenv(SHEET_NAME_ENV, 'Bot_de_asistencia_2026')
-
-    # Verificar si existe el archivo de credenciales
-    if not os.path.exists(CREDENTIALS_FILE) and not os.path.exists('credentials.json'):
-        logging.warning("⚠️ No se encontraron credenciales para Google Sheets.")
+    if not practicantes:
+        return False
+
+    # Una fila por id_discord (la última del Excel prevalece)
+    por_id = {p['id_discord']: p for p in practicantes}
+    hashes_hoja = {
+        discord_id: _hash_fila(p['nombre_completo'], p['horas_base'])
+        for discord_id, p in por_id.items()
+    }
+    snapshot = hashlib.sha1("".join(f"{k}:{v};" for k, v in sorted(hashes_hoja.items())).encode()).hexdigest()
+
+    if not forzar and snapshot == _estado_sync["snapshot"]:
+        _estado_sync["modified_time"] = _estado_sync["modified_time_leido"]
+        logging.info("⏩ Practicantes sin cambios en Sheets (misma huella).")
         return
 
-    creds_path = CREDENTIALS_FILE if os.path.exists(CREDENTIALS_FILE) else 'credentials.json'
-
-    try:
-        creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
-        client = gspread.authorize(creds)
-        spreadsheet = client.open(sheet_name)
-
-        # 2. Obtener o crear la hoja de reporte detallado
-        try:
-            worksheet_det = spreadsheet.worksheet("Reporte Detallado")
-        except gspread.WorksheetNotFound:
-            worksheet_det = spreadsheet.add_worksheet(title="Reporte Detallado", rows="1000", cols="10")
-
-        # 3. Formatear datos para gspread (Detallado)
-        headers_det = ["Fecha", "Nombre Completo", "Entrada", "Salida", "Horas Sesión", "Estado"]
-        rows_det = [headers_det]
-
-        last_date = None
-        header_positions = [] # Para almacenar índices de filas de encabezado
-
-        for row in data:
-            current_date = row['Fecha']
-            if current_date != last_date:
-                # Insertar fila de encabezado de fecha
-                date_str = get_spanish_date(current_date)
-                rows_det.append([date_str, "", "", "", "", ""])
-                header_positions.append(len(rows_det)) # 1-indexed para Sheets
-                last_date = current_date
-
-            rows_det.append([
-                str(row['Fecha']),
-                row.get('Nombre_Completo', 'N/A'),
-                str(row['Entrada']) if row['Entrada'] else '-',
-                str(row['Salida']) if row['Salida'] else '-',
-                format_duration(str(row['Horas_Sesion'])),
-                row['Estado']
-            ])
-
-        # 4. Limpiar y actualizar Detallado
-        worksheet_det.clear()
-
-        # Resetear formato de toda la hoja (A1:Z500) para evitar colores/estilos residuales
-        worksheet_det.format("A1:Z1000", {
-            "backgroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0},
-            "textFormat": {"bold": False, "foregroundColor": {"red": 0.0, "green": 0.0, "blue": 0.0}, "fontSize": 10}
-        })
-
-        worksheet_det.update('A1', rows_det)
-
-        # Aplicar formato a los encabezados de fecha (celeste claro y negrita)
-        if header_positions:
-            for pos in header_positions:
-                range_str = f"A{pos}:F{pos}"
-                worksheet_det.format(range_str, {
-                    "backgroundColor": {"red": 0.85, "green": 0.92, "blue": 1.0},
-                    "textFormat": {"bold": True, "fontSize": 11}
-                })
-
-        # Formato para el encabezado principal (A1:F1)
-        worksheet_det.format("A1:F1", {
-            "backgroundColor": {"red": 0.2, "green": 0.2, "blue": 0.2},
-            "textFormat": {"foregroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0}, "bold": True}
-        })
-
-        # ---------------------------------------------------------
-        # 5. Generar Hoja de "Resumen General" (Acumulado por alumno)
-        # ---------------------------------------------------------
+    # Comparar con el estado actual de la BD
+    actuales = await db.fetch_all("SELECT id, id_discord, nombre_completo, horas_base FROM practicante")
+    hashes_bd = {row['id_discord']: _hash_fila(row['nombre_completo'], row['horas_base']) for row in actuales}
+    cachear_practicantes((row['id_discord'], row['id']) for row in actuales)
+
+    cambios = [discord_id for discord_id, h in hashes_hoja.items() if hashes_bd.get(discord_id) != h]
+    removidos = set(hashes_bd) - set(hashes_hoja)
+
+    if cambios:
+        filas = [(d, por_id[d]['nombre_completo'], por_id[d]['horas_base']) for d in cambios]
+        resultado = await db.bulk_upsert(
+            "practicante",
+            ("id_discord", "nombre_completo", "horas_base"),
+            filas,
+            key_column="id_discord"
+        )
+        logging.info(
+            f"📥 Practicantes: {resultado['inserted']} nuevos, {resultado['updated']} actualizados, "
+            f"{resultado['unchanged']} sin cambios."
+        )
+        if resultado['updated']:
+            # Los nombres del 'Reporte Detallado' pueden haber cambiado
+            _estado_detallado["reconstruir"] = True
+        if resultado['inserted'] or resultado['updated']:
+            # Nombres y horas base salen en 'Resumen General' y 'Detallado'
+            marcar_cambio_asistencia()
+
+        # Precargar el caché con los ids de los recién insertados
+        if resultado['inserted']:
+            marcadores = ", ".join(["%s"] * len(cambios))
+            nuevos = await db.fetch_all(
+                f"SELECT id, id_discord FROM practicante WHERE id_discord IN ({marcadores})", cambios
+            )
+            cachear_practicantes((row['id_discord'], row['id']) for row in nuevos)
+
+    # Los retirados del Excel no se borran (eso se hace con /admin eliminar_practicante)
+    if removidos:
+        logging.info(f"ℹ️ {len(removidos)} practicantes de la BD ya no figuran en Sheets (no se eliminan).")
+
+    _estado_sync["snapshot"] = snapshot
+    _estado_sync["modified_time"] = _estado_sync["modified_time_leido"]
+
+    logging.info(f"📥 Sincronización completa desde Sheets ({len(cambios)} filas escritas).")
+
+# Formatos del 'Reporte Detallado'
+FORMATO_BASE = {
+    "backgroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0},
+    "textFormat": {"bold": False, "foregroundColor": {"red": 0.0, "green": 0.0, "blue": 0.0}, "fontSize": 10}
+}
+FORMATO_FECHA = {
+    "backgroundColor": {"red": 0.85, "green": 0.92, "blue": 1.0},
+    "textFormat": {"bold": True, "fontSize": 11}
+}
+FORMATO_ENCABEZADO = {
+    "backgroundColor": {"red": 0.2, "green": 0.2, "blue": 0.2},
+    "textFormat": {"foregroundColor": {"red": 1.0, "green": 1.0, "blue": 1.0}, "bold": True}
+}
+COLUMNAS_DETALLADO = 6
+
+def _rango(sheet_id, fila_inicio=None, fila_fin=None, col_inicio=None, col_fin=None):
+    """GridRange (índices 0-based, fin exclusivo). Sin índices abarca toda la hoja."""
+    rango = {"sheetId": sheet_id}
+    for clave, valor in (("startRowIndex", fila_inicio), ("endRowIndex", fila_fin),
+                         ("startColumnIndex", col_inicio), ("endColumnIndex", col_fin)):
+        if valor is not None:
+            rango[clave] = valor
+    return rango
+
+def _req_formato(rango, formato):
+    """repeatCell equivalente a Worksheet.format()."""
+    return {"repeatCell": {
+        "range": rango,
+        "cell": {"userEnteredFormat": formato},
+        "fields": "userEnteredFormat(" + ",".join(formato.keys()) + ")"
+    }}
+
+def _req_valores(sheet_id, fila, filas):
+    """updateCells con valores RAW (texto) a partir de la fila indicada (0-based)."""
+    return {"updateCells": {
+        "start": {"sheetId": sheet_id, "rowIndex": fila, "columnIndex": 0},
+        "rows": [
+            {"values": [{"userEnteredValue": {"stringValue": str(v)}} if v not in (None, "") else {} for v in fila_valores]}
+            for fila_valores in filas
+        ],
+        "fields": "userEnteredValue"
+    }}
+
+def _requests_reporte_detallado(sheet_id, rows_det, header_positions):
+    """
+    Cuerpo completo de batch_update para reescribir 'Reporte Detallado':
+    tamaño de la hoja, limpieza, reseteo de formato, valores, bandas de fecha y encabezado.
+    """
+    requests = [
+        {"updateSheetProperties": {
+            "properties": {"sheetId": sheet_id, "gridProperties": {"rowCount": max(1000, len(rows_det) + 100)}},
+            "fields": "gridProperties.rowCount"
+        }},
+        {"updateCells": {"range": _rango(sheet_id), "fields": "userEnteredValue"}},
+        _req_formato(_rango(sheet_id), FORMATO_BASE),
+        _req_valores(sheet_id, 0, rows_det),
+    ]
+    # Encabezados de fecha (celeste claro y negrita); header_positions es 1-indexed
+    for pos in header_positions:
+        requests.append(_req_formato(_rango(sheet_id, pos - 1, pos, 0, COLUMNAS_DETALLADO), FORMATO_FECHA))
+    # Encabezado principal (A1:F1)
+    requests.append(_req_formato(_rango(sheet_id, 0, 1, 0, COLUMNAS_DETALLADO), FORMATO_ENCABEZADO))
+    return requests
+
+# Estado del export incremental de 'Reporte Detallado' (en memoria: tras reiniciar se reconstruye)
+_estado_detallado = {
+    "filas": [],          # filas debajo del encabezado: ("fecha", date) o ("asis", Asistencia_ID)
+    "asistencias": {},    # Asistencia_ID -> (fecha, nombre, hash de la fila exportada)
+    "hwm": None,          # máximo Actualizado_En ya exportado (high-water mark)
+    "reconstruir": True,  # forzar reconstrucción completa en el próximo ciclo
+}
+
+# actualizado_en se asigna al ejecutar la sentencia pero la fila se confirma después
+# (junto con el recálculo de totales): el high-water mark se relee con este margen
+# para no perder actualizaciones confirmadas tarde. Releer filas sin cambios no escribe nada.
+MARGEN_HWM = datetime.timedelta(seconds=60)
+
+HEADERS_DETALLADO = ["Fecha", "Nombre Completo", "Entrada", "Salida", "Horas Sesión", "Estado"]
+
+def _fila_detallado(row):
+    """Valores de una fila de asistencia en 'Reporte Detallado'."""
+    return [
+        str(row['Fecha']),
+        row.get('Nombre_Completo', 'N/A'),
+        str(row['Entrada']) if row['Entrada'] else '-',
+        str(row['Salida']) if row['Salida'] else '-',
+        format_duration(str(row['Horas_Sesion'])),
+        row['Estado']
+    ]
+
+def _fila_fecha(fecha):
+    """Fila de encabezado de fecha (banda celeste)."""
+    return [get_spanish_date(fecha), "", "", "", "", ""]
+
+def _hash_valores(valores):
+    return hashlib.sha1("|".join(str(v) for v in valores).encode("utf-8")).hexdigest()
+
+def _insertar_en_layout(filas, asistencias, fecha, nombre, asis_id):
+    """
+    Inserta una asistencia nueva en el layout respetando Fecha DESC, Nombre ASC.
+    Retorna las posiciones insertadas como [(indice, tipo)].
+    """
+    i = 0
+    while i < len(filas):
+        tipo, valor = filas[i]
+        if tipo == "fecha" and valor == fecha:
+            j = i + 1
+            while j < len(filas) and filas[j][0] == "asis" and asistencias[filas[j][1]][1].casefold() <= nombre.casefold():
+                j += 1
+            filas.insert(j, ("asis", asis_id))
+            return [(j, "asis")]
+        if tipo == "fecha" and valor < fecha:
+            break
+        i += 1
+    filas.insert(i, ("fecha", fecha))
+    filas.insert(i + 1, ("asis", asis_id))
+    return [(i, "fecha"), (i + 1, "asis")]
+
+async def _reconstruir_detallado(spreadsheet, worksheet_det, data):
+    """Reescribe 'Reporte Detallado' completo y reinicia el estado incremental."""
+    rows_det = [HEADERS_DETALLADO]
+    filas = []
+    asistencias = {}
+    header_positions = [] # Para almacenar índices de filas de encabezado
+
+    last_date = None
+    for row in data:
+        current_date = row['Fecha']
+        if current_date != last_date:
+            # Insertar fila de encabezado de fecha
+            rows_det.append(_fila_fecha(current_date))
+            filas.append(("fecha", current_date))
+            header_positions.append(len(rows_det)) # 1-indexed para Sheets
+            last_date = current_date
+
+        valores = _fila_detallado(row)
+        rows_det.append(valores)
+        filas.append(("asis", row['Asistencia_ID']))
+        asistencias[row['Asistencia_ID']] = (current_date, valores[1], _hash_valores(valores))
+
+    # Limpiar, escribir y dar formato al Detallado en un único batch_update
+    body = {"requests": _requests_reporte_detallado(worksheet_det.id, rows_det, header_positions)}
+    await _en_hilo(spreadsheet.batch_update, body)
+
+    _estado_detallado.update({
+        "filas": filas,
+        "asistencias": asistencias,
+        "hwm": max((row['Actualizado_En'] for row in data), default=None),
+        "reconstruir": False,
+    })
+
+async def _actualizar_detallado(spreadsheet, worksheet_det, db):
+    """
+    Aplica solo las filas nuevas o modificadas desde el high-water mark.
+    Retorna la cantidad de filas escritas, o None si la hoja está desincronizada
+    y hace falta una reconstrucción completa.
+    """
+    estado = _estado_detallado
+    cambios = await db.fetch_all(
+        "SELECT * FROM reporte_asistencia WHERE Actualizado_En >= %s ORDER BY Fecha DESC, Nombre_Completo ASC",
+        (estado["hwm"] - MARGEN_HWM,)
+    )
+    nuevos = [row for row in cambios if row['Asistencia_ID'] not in estado["asistencias"]]
+
+    # Si hubo borrados (p. ej. /admin eliminar_practicante) el layout ya no coincide
+    total = await db.fetch_one("SELECT COUNT(*) AS total FROM asistencia")
+    if total['total'] != len(estado["asistencias"]) + len(nuevos):
+        return None
+
+    sheet_id = worksheet_det.id
+    filas = list(estado["filas"])
+    asistencias = dict(estado["asistencias"])
+    requests = []
+    escritas = 0
+
+    for row in cambios:
+        asis_id = row['Asistencia_ID']
+        valores = _fila_detallado(row)
+        h = _hash_valores(valores)
+        conocida = asistencias.get(asis_id)
+
+        if conocida:
+            if conocida[2] == h:
+                continue
+            if conocida[0] != row['Fecha'] or conocida[1] != valores[1]:
+                return None  # cambió la posición de la fila: reconstruir
+            indice = filas.index(("asis", asis_id))
+            requests.append(_req_valores(sheet_id, indice + 1, [valores]))
+        else:
+            asistencias[asis_id] = (row['Fecha'], valores[1], h)
+            for indice, tipo in _insertar_en_layout(filas, asistencias, row['Fecha'], valores[1], asis_id):
+                fila_sheet = indice + 1  # la fila 0 es el encabezado principal
+                requests.append({"insertDimension": {
+                    "range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": fila_sheet, "endIndex": fila_sheet + 1},
+                    "inheritFromBefore": False
+                }})
+                requests.append(_req_formato(_rango(sheet_id, fila_sheet, fila_sheet + 1), FORMATO_BASE))
+                if tipo == "fecha":
+                    requests.append(_req_formato(_rango(sheet_id, fila_sheet, fila_sheet + 1, 0, COLUMNAS_DETALLADO), FORMATO_FECHA))
+                    requests.append(_req_valores(sheet_id, fila_sheet, [_fila_fecha(row['Fecha'])]))
+                else:
+                    requests.append(_req_valores(sheet_id, fila_sheet, [valores]))
+
+        asistencias[asis_id] = (row['Fecha'], valores[1], h)
+        escritas += 1
+
+    if requests:
+        # Verificar que la hoja siga teniendo el layout que recordamos antes de parchearla
+        columna_a = await _en_hilo(worksheet_det.col_values, 1)
+        if len(columna_a) != len(estado["filas"]) + 1:
+            return None
+        await _en_hilo(spreadsheet.batch_update, {"requests": requests})
+
+    estado.update({
+        "filas": filas,
+        "asistencias": asistencias,
+        "hwm": max([estado["hwm"]] + [row['Actualizado_En'] for row in cambios]),
+    })
+    return escritas
+
+async def _etapa_detallado(spreadsheet, db, completo: bool = False):
+    """'Reporte Detallado': incremental desde el high-water mark, o reconstrucción completa."""
+    worksheet_det = await _sesion.worksheet(spreadsheet, "Reporte Detallado", rows="1000", cols="10")
+
+    escritas = None
+    if not (completo or _estado_detallado["reconstruir"] or _estado_detallado["hwm"] is None):
+        escritas = await _actualizar_detallado(spreadsheet, worksheet_det, db)
+        if escritas is None:
+            logging.warning("⚠️ 'Reporte Detallado' desincronizado. Reconstruyendo...")
+
+    if escritas is None:
+        query = "SELECT * FROM reporte_asistencia ORDER BY Fecha DESC, Nombre_Completo ASC"
+        data = await db.fetch_all(query)
+
+        if not data:
+            logging.info("↻ Reporte Sheets: No hay datos para exportar.")
+            return
+
+        await _reconstruir_detallado(spreadsheet, worksheet_det, data)
+        escritas = len(data)
+
+    logging.info(f"📊 'Reporte Detallado' actualizado ({escritas} filas escritas).")
+
+async def _etapa_resumen(spreadsheet, db, completo: bool = False):
+    """'Resumen General': acumulado por alumno desde los totales materializados."""
+    worksheet_res = await _sesion.worksheet(spreadsheet, "Resumen General", rows="100", cols="6")
+
+    query_resumen = """
+    SELECT 
+        Nombre_Completo AS nombre_completo,
+        IFNULL(Horas_Base, '00:00:00') as Horas_Base,
+        Horas_Bot as Horas_Trabajadas_Bot,
+        Total_Acumulado,
+        -- Meta (480 horas)
+        '480:00:00' as Meta
+    FROM resumen_practicantes
+    ORDER BY Total_Acumulado DESC
+    """
+    data_resumen = await db.fetch_all(query_resumen)
+
+    headers_res = ["Nombre Completo", "Horas Base (Anteriores)", "Horas Bot (Nuevas)", "TOTAL ACUMULADO", "Meta (480h)"]
+    rows_res = [headers_res]
+
+    for row in data_resumen:
+        rows_res.append([
+            row['nombre_completo'],
+            format_duration(str(row['Horas_Base'])),
+            format_duration(str(row['Horas_Trabajadas_Bot'])),
+            format_duration(str(row['Total_Acumulado'])),
+            row['Meta']
+        ])
+
+    await _en_hilo(worksheet_res.clear)
+    await _en_hilo(worksheet_res.update, 'A1', rows_res)
+
+    logging.info(f"📊 'Resumen General' actualizado ({len(data_resumen)} filas).")
+
+async def _etapa_anti_farming(spreadsheet, db, completo: bool = False):
+    """'Reporte Anti-Farming': aplica las validaciones marcadas con OK y reescribe los incidentes."""
+    worksheet_af = await _sesion.worksheet(spreadsheet, "Reporte Anti-Farming", rows="100", cols="6")
+
+    # Leer validaciones antes de limpiar
+    current_af_data = await _en_hilo(worksheet_af.get_all_values)
+    if len(current_af_data) > 1:
+        headers_af_current = [h.lower() for h in current_af_data[0]]
+        # Encontrar índices
         try:
-            worksheet_res = spreadsheet.worksheet("Resumen General")
-        except gspread.WorksheetNotFound:
-            worksheet_res = spreadsheet.add_worksheet(title="Resumen General", rows="100", cols="6")
-
-        # Consulta de resumen: agrupa horas por practicante
-        query_resumen = """
-        SELECT 
-            p.nombre_completo, 
-            IFNULL(p.horas_base, '00:00:00') as Horas_Base,
-            -- Suma de horas trabajadas (diferencia salida - entrada)
-            SEC_TO_TIME(SUM(IFNULL(TIME_TO_SEC(TIMEDIFF(a.hora_salida, a.hora_entrada)), 0))) as Horas_Trabajadas_Bot,
-            -- Total (Base + Bot)
-            ADDTIME(
-                IFNULL(p.horas_base, '00:00:00'),
-                SEC_TO_TIME(SUM(IFNULL(TIME_TO_SEC(TIMEDIFF(a.hora_salida, a.hora_entrada)), 0)))
-            ) as Total_Acumulado,
-            -- Meta (480 horas)
-            '480:00:00' as Meta
-        FROM practicante p
-        LEFT JOIN asistencia a ON p.id = a.practicante_id AND a.hora_salida IS NOT NULL
-        GROUP BY p.id, p.nombre_completo, p.horas_base
-        ORDER BY Total_Acumulado DESC
-        """
-        data_resumen = await db.fetch_all(query_resumen)
+            idx_id_af = next(i for i, h in enumerate(headers_af_current) if 'id' in h or 'discord' in h)
+            idx_fecha_af = next(i for i, h in enumerate(headers_af_current) if 'fecha' in h)
+            idx_val_af = next(i for i, h in enumerate(headers_af_current) if 'validado' in h)
+
+            pares = []
+            for row_af in current_af_data[1:]:
+                if len(row_af) > idx_val_af and row_af[idx_val_af].strip().upper() == "OK":
+                    # Limpiar ID
+                    discord_id_val = "".join(filter(str.isdigit, row_af[idx_id_af].strip()))
+                    fecha_val = row_af[idx_fecha_af].strip()
+                    if discord_id_val and fecha_val:
+                        pares.append((int(discord_id_val), fecha_val))
+
+            # Todas las validaciones en una sola sentencia por lote y una transacción
+            if pares:
+                resultados = await db.validar_horas_extra(pares)
+                validados = sum(resultados.values())
+                logging.info(f"💎 Anti-Farming: {validados} de {len(resultados)} validaciones aplicadas.")
+                if validados:
+                    # Las horas validadas cambian totales y detallado: se exportan en el próximo ciclo
+                    from utils import marcar_cambio_asistencia
+                    marcar_cambio_asistencia()
+                for (discord_id_val, fecha_val), ok in resultados.items():
+                    if not ok:
+                        logging.debug(f"⏩ Sin horas extra pendientes para ID {discord_id_val} el {fecha_val}.")
+        except StopIteration:
+            logging.warning("⚠️ No se pudieron encontrar las columnas necesarias en Reporte Anti-Farming para validar.")
+
+    # Consulta de incidentes (donde horas_extra > 0)
+    query_af = """
+    SELECT 
+        p.id_discord,
+        p.nombre_completo,
+        a.fecha,
+        a.horas_extra,
+        a.hora_salida as hora_limite_aplicada
+    FROM asistencia a
+    JOIN practicante p ON a.practicante_id = p.id
+    WHERE a.horas_extra > '00:00:00'
+    ORDER BY a.fecha DESC
+    """
+    data_af = await db.fetch_all(query_af)
 
-        headers_res = ["Nombre Completo", "Horas Base (Anteriores)", "Horas Bot (Nuevas)", "TOTAL ACUMULADO", "Meta (480h)"]
-        rows_res = [headers_res]
+    headers_af = ["ID Discord", "Nombre Completo", "Fecha", "Horas Extra (No Contadas)", "Salida Automática", "Validado (X/OK)"]
+    rows_af = [headers_af]
 
-        for row in data_resumen:
-            rows_res.append([
-                row['nombre_completo'],
-                format_duration(str(row['Horas_Base'])),
-                format_duration(str(row['Horas_Trabajadas_Bot'])),
-                format_duration(str(row['Total_Acumulado'])),
-                row['Meta']
-            ])
+    for row in data_af:
+        rows_af.append([
+            str(row['id_discord']),
+            row['nombre_completo'],
+            str(row['fecha']),
+            str(row['horas_extra']),
+            str(row['hora_limite_aplicada']),
+            ""  # Columna vacía para validación manual
+        ])
 
-        worksheet_res.clear()
-        worksheet_res.update('A1', rows_res)
+    await _en_hilo(worksheet_af.clear)
+    await _en_hilo(worksheet_af.update, 'A1', rows_af)
+    logging.info(f"🚨 Reporte Anti-Farming actualizado: {len(data_af)} incidentes pendientes.")
 
-        logging.info(f"📊 Reportes actualizados: 'Reporte Detallado' ({len(data)} filas) y 'Resumen General' ({len(data_resumen)} filas).")
 
-        # ---------------------------------------------------------
-        # 6. Generar Hoja de "Reporte Anti-Farming" (Incidentes)
-        # ---------------------------------------------------------
-        try:
-            worksheet_af = spreadsheet.worksheet("Reporte Anti-Farming")
-        except gspread.WorksheetNotFound:
-            worksheet_af = spreadsheet.add_worksheet(title="Reporte Anti-Farming", rows="100", cols="6")
+class EtapaReporte:
+    """
+    Etapa independiente del export a Sheets, con su propio intervalo,
+    timeout, reintentos y registro del último éxito.
+    Con intervalo=None la etapa solo corre cuando hay cambios que exportar.
+    """
 
-        # --- NUEVO: Leer validaciones antes de limpiar ---
-        try:
-            current_af_data = worksheet_af.get_all_values()
-            if len(current_af_data) > 1:
-                headers_af_current = [h.lower() for h in current_af_data[0]]
-                # Encontrar índices
-                try:
-                    idx_id_af = next(i for i, h in enumerate(headers_af_current) if 'id' in h or 'discord' in h)
-                    idx_fecha_af = next(i for i, h in enumerate(headers_af_current) if 'fecha' in h)
-                    idx_val_af = next(i for i, h in enumerate(headers_af_current) if 'validado' in h)
-
-                    for row_af in current_af_data[1:]:
-                        if len(row_af) > idx_val_af and row_af[idx_val_af].strip().upper() == "OK":
-                            discord_id_val = row_af[idx_id_af].strip()
-                            fecha_val = row_af[idx_fecha_af].strip()
-
-                            # Limpiar ID
-                            discord_id_val = "".join(filter(str.isdigit, discord_id_val))
-
-                            if discord_id_val and fecha_val:
-                                logging.info(f"💎 Validando horas extra para ID {discord_id_val} el {fecha_val}...")
-                                query_validate = """
-                                UPDATE asistencia a 
-                                JOIN practicante p ON a.practicante_id = p.id 
-                                SET a.hora_salida = ADDTIME(a.hora_salida, a.horas_extra), 
-                                    a.horas_extra = '00:00:00',
-                                    a.observaciones = CONCAT(IFNULL(a.observaciones, ''), '\n[Sistema] Horas validadas mediante Google Sheets.')
-                                WHERE p.id_discord = %s AND a.fecha = %s AND a.horas_extra > '00:00:00'
-                                """
-                                await db.execute_query(query_validate, (discord_id_val, fecha_val))
-                except StopIteration:
-                    logging.warning("⚠️ No se pudieron encontrar las columnas necesarias en Reporte Anti-Farming para validar.")
-        except Exception as e:
-            logging.error(f"⚠️ Error al intentar leer validaciones de Anti-Farming: {e}")
-
-        # Consulta de incidentes (donde horas_extra > 0)
-        query_af = """
-        SELECT 
-            p.id_discord,
-            p.nombre_completo,
-            a.fecha,
-            a.horas_extra,
-            a.hora_salida as hora_limite_aplicada
-        FROM asistencia a
-        JOIN practicante p ON a.practicante_id = p.id
-        WHERE a.horas_extra > '00:00:00'
-        ORDER BY a.fecha DESC
+    def __init__(self, nombre, funcion, intervalo, timeout=None, reintentos=None):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.intervalo = intervalo
+        self.timeout = timeout or Settings.SHEETS_STAGE_TIMEOUT
+        self.reintentos = Settings.SHEETS_STAGE_RETRIES if reintentos is None else reintentos
+        self.ultimo_intento = None
+        self.ultimo_exito = None
+        self.ultimo_error = None
+        self._lock = asyncio.Lock()
+
+    def vencida(self, ahora=None):
+        if self.intervalo is None:
+            return False
+        ahora = ahora if ahora is not None else time.monotonic()
+        return self.ultimo_intento is None or ahora - self.ultimo_intento >= self.intervalo
+
+    async def ejecutar(self, spreadsheet, db, completo=False):
         """
-        data_af = await db.fetch_all(query_af)
-
-        headers_af = ["ID Discord", "Nombre Completo", "Fecha", "Horas Extra (No Contadas)", "Salida Automática", "Validado (X/OK)"]
-        rows_af = [headers_af]
-
-        for row in data_af:
-            rows_af.append([
-                str(row['id_discord']),
-                row['nombre_completo'],
-                str(row['fecha']),
-                str(row['horas_extra']),
-                str(row['hora_limite_aplicada']),
-                ""  # Columna vacía para validación manual
-            ])
+        Ejecuta la etapa con timeout y reintentos.
+        Retorna True si terminó bien, False si falló y None si se omitió
+        porque otra ejecución de la misma etapa seguía en curso.
+        """
+        if self._lock.locked():
+            logging.info(f"⏩ Etapa '{self.nombre}' aún en curso, se omite.")
+            return None
+
+        async with self._lock:
+            self.ultimo_intento = time.monotonic()
+            for intento in range(self.reintentos + 1):
+                inicio = time.perf_counter()
+                try:
+                    await asyncio.wait_for(self.funcion(spreadsheet, db, completo=completo), timeout=self.timeout)
+                except Exception as e:
+                    metrics.registrar_sheets(self.nombre, time.perf_counter() - inicio, False)
+                    self.ultimo_error = f"{type(e).__name__}: {e}"
+                    logging.error(f"❌ Etapa '{self.nombre}' falló (intento {intento + 1}/{self.reintentos + 1}): {self.ultimo_error}")
+                    if intento < self.reintentos:
+                        await asyncio.sleep(2 ** intento * 5)
+                    continue
+
+                metrics.registrar_sheets(self.nombre, time.perf_counter() - inicio, True)
+                self.ultimo_exito = datetime.datetime.now(datetime.timezone.utc)
+                self.ultimo_error = None
+                try:
+                    await db.guardar_estado_bot(f"sheets:{self.nombre}:ultimo_exito", self.ultimo_exito.isoformat())
+                except Exception as e:
+                    logging.warning(f"⚠️ No se pudo guardar el último éxito de '{self.nombre}': {e}")
+                return True
+            return False
+
+
+# Etapas del export: detallado y resumen solo cambian con la asistencia; la ingesta de
+# validaciones Anti-Farming además se sondea, porque la editan personas en la hoja
+ETAPAS = {
+    "reporte_detallado": EtapaReporte("reporte_detallado", _etapa_detallado, None),
+    "resumen_general": EtapaReporte("resumen_general", _etapa_resumen, None),
+    "anti_farming": EtapaReporte("anti_farming", _etapa_anti_farming, Settings.SHEETS_ANTI_FARMING_INTERVAL),
+}
+
+# modifiedTime del Spreadsheet tras la última ingesta Anti-Farming (si no cambió, nadie validó nada)
+_estado_anti_farming = {"modified_time": None}
+
+async def ejecutar_etapas(nombres=None, completo: bool = False, solo_vencidas: bool = False,
+                          solo_si_editado: bool = False):
+    """
+    Ejecuta en paralelo las etapas indicadas (todas por defecto) sobre el mismo Spreadsheet.
+    Con solo_vencidas=True corre únicamente las que cumplieron su intervalo.
+    Con solo_si_editado=True no hace nada si el Spreadsheet no cambió desde la última ingesta Anti-Farming.
+    Retorna nombre -> True/False/None (omitida) según el resultado de cada etapa.
+    """
+    import database as db
 
-        worksheet_af.clear()
-        worksheet_af.update('A1', rows_af)
-        logging.info(f"🚨 Reporte Anti-Farming actualizado: {len(data_af)} incidentes pendientes.")
+    etapas = [ETAPAS[n] for n in (nombres or ETAPAS)]
+    if solo_vencidas:
+        ahora = time.monotonic()
+        etapas = [e for e in etapas if e.vencida(ahora)]
+    if not etapas:
+        return {}
 
+    # Verificar si existe el archivo de credenciales
+    if SesionSheets.ruta_credenciales() is None:
+        logging.warning("⚠️ No se encontraron credenciales para Google Sheets.")
+        return {}
 
+    sheet_name = os.getenv(SHEET_NAME_ENV, 'Bot_de_asistencia_2026')
+    try:
+        spreadsheet = await _sesion.spreadsheet(sheet_name)
+        # Si nadie más tocó el Spreadsheet desde la última sync, nuestras escrituras
+        # no deben obligar a releer la hoja de practicantes en el siguiente ciclo
+        modified_antes = await _modified_time(spreadsheet)
     except Exception as e:
-        logging.error(f"❌ Error al exportar reporte a Google Sheets: {e}")
+        _sesion.invalidar()
+        logging.error(f"❌ Error al abrir Google Sheets: {e}")
+        return {e.nombre: False for e in etapas}
+    if solo_si_editado and modified_antes is not None and modified_antes == _estado_anti_farming["modified_time"]:
+        ahora = time.monotonic()
+        for etapa in etapas:
+            etapa.ultimo_intento = ahora
+        return {}
+    escritura_propia = modified_antes is not None and modified_antes == _estado_sync["modified_time"]
+
+    # La ingesta Anti-Farming modifica horas_extra y totales: va primero para que
+    # el detallado y el resumen de este mismo export ya lean las horas validadas
+    anti_farming = ETAPAS["anti_farming"]
+    resultados_por_etapa = {}
+    if anti_farming in etapas:
+        resultados_por_etapa[anti_farming] = await anti_farming.ejecutar(spreadsheet, db, completo=completo)
+    lectoras = [e for e in etapas if e is not anti_farming]
+    for etapa, ok in zip(lectoras, await asyncio.gather(*(e.ejecutar(spreadsheet, db, completo=completo) for e in lectoras))):
+        resultados_por_etapa[etapa] = ok
+    resultados = [resultados_por_etapa[e] for e in etapas]
+    if any(ok is False for ok in resultados):
+        _sesion.invalidar()
+
+    ingesta_ok = resultados_por_etapa.get(anti_farming) is True
+    if escritura_propia or ingesta_ok:
+        # Nuestras propias escrituras no cuentan como edición para los siguientes ciclos
+        modified_despues = await _modified_time(spreadsheet)
+        if escritura_propia:
+            _estado_sync["modified_time"] = modified_despues
+        if ingesta_ok:
+            _estado_anti_farming["modified_time"] = modified_despues
+
+    return {e.nombre: ok for e, ok in zip(etapas, resultados)}
+
+# Tras un export fallido no se reintenta antes de este instante (time.monotonic)
+_estado_export = {"reintentar_desde": 0.0}
+
+async def exportar_cambios_pendientes(sondear_anti_farming: bool = True):
+    """
+    Export a Sheets guiado por cambios: corre todas las etapas solo si hay asistencia
+    marcada como modificada y las marcas se calmaron (SHEETS_DEBOUNCE) o la más antigua
+    supera SHEETS_MAX_STALENESS. Sin cambios, solo sondea la ingesta Anti-Farming y
+    únicamente la ejecuta si alguien editó el Spreadsheet.
+    Retorna nombre -> True/False de las etapas ejecutadas ({} si no hizo nada).
+    """
+    from utils import cambios_sheets
+
+    ahora = time.monotonic()
+    if ahora >= _estado_export["reintentar_desde"] and cambios_sheets.listo(
+            Settings.SHEETS_DEBOUNCE, Settings.SHEETS_MAX_STALENESS, ahora):
+        tomado = cambios_sheets.tomar()
+        marcas, primera_marca = tomado
+        logging.info(
+            f"📤 Exportando a Sheets tras {marcas} cambios de asistencia "
+            f"(el más antiguo hace {ahora - primera_marca:.0f}s)."
+        )
+        resultados = await ejecutar_etapas()
+        if any(ok is False for ok in resultados.values()):
+            # Se conservan los cambios y su antigüedad; se reintenta tras la ventana máxima
+            cambios_sheets.devolver(tomado)
+            _estado_export["reintentar_desde"] = time.monotonic() + Settings.SHEETS_MAX_STALENESS
+        elif any(ok is None for ok in resultados.values()):
+            # Alguna etapa seguía ocupada: los cambios vuelven y se reintentan en el próximo ciclo
+            cambios_sheets.devolver(tomado)
+        return resultados
+
+    if sondear_anti_farming and ETAPAS["anti_farming"].vencida(ahora):
+        return await ejecutar_etapas(["anti_farming"], solo_si_editado=True)
+    return {}
+
+async def export_report_to_sheet(completo: bool = False):
+    """
+    Exporta todos los reportes a Google Sheets (todas las etapas, en paralelo).
+    'Reporte Detallado' se actualiza de forma incremental; se reconstruye completo
+    solo si completo=True, en el primer ciclo o si la hoja está desincronizada.
+    """
+    resultados = await ejecutar_etapas(completo=completo)
+    return all(resultados.values())
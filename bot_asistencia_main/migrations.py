@@ -0,0 +1,289 @@
+"""
+Migraciones versionadas del esquema.
+Cada migración se aplica una sola vez y queda registrada en schema_version;
+con la base de datos al día, el arranque solo consulta la versión actual.
+"""
+
+import logging
+from typing import Awaitable, Callable, List, NamedTuple, Sequence, Union
+
+import aiomysql
+
+import database as db
+
+# Código de error MySQL/TiDB para tabla inexistente
+ER_NO_SUCH_TABLE = 1146
+
+# Un paso es una sentencia SQL o una función async que recibe el cursor
+Paso = Union[str, Callable[[aiomysql.Cursor], Awaitable[None]]]
+
+
+class Migracion(NamedTuple):
+    version: int
+    descripcion: str
+    pasos: Sequence[Paso]
+
+
+async def _seed_estados(cursor):
+    estados = ['Presente', 'Tardanza', 'Falta Injustificada', 'Falta Recuperada', 'Permiso']
+    await cursor.executemany("INSERT IGNORE INTO estado_asistencia (estado) VALUES (%s)", [(e,) for e in estados])
+
+
+async def _seed_admins(cursor):
+    # Equipo inicial (Equipo de Desarrollo)
+    admins = [
+        (615932763161362636, 'Renso Mamani', 'Dev Principal'),
+        (824692049084678144, 'Wilber Peralta', 'Product Owner'),
+        (1395195164779347988, 'Jordy', 'Developer')
+    ]
+    await cursor.executemany(
+        "INSERT IGNORE INTO bot_admins (discord_id, nombre_referencia, rol) VALUES (%s, %s, %s)", admins
+    )
+
+
+async def _agregar_actualizado_en(cursor):
+    # Marca de modificación para el export incremental a Sheets
+    await cursor.execute("""
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'asistencia' AND column_name = 'actualizado_en'
+    """)
+    if not await cursor.fetchone():
+        await cursor.execute("""
+        ALTER TABLE asistencia
+            ADD COLUMN actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            ADD KEY idx_asistencia_actualizado (actualizado_en)
+        """)
+
+
+async def _reconstruir_totales(cursor):
+    await cursor.execute("DELETE FROM practicante_totales")
+    await cursor.execute(db.sql_recalcular_totales())
+
+
+async def _crear_indices(cursor):
+    for tabla, nombre, columnas in db.INDICES_SECUNDARIOS:
+        await cursor.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+        """, (tabla, nombre))
+        if not await cursor.fetchone():
+            await cursor.execute(f"CREATE INDEX {nombre} ON {tabla} ({columnas})")
+            logging.info(f"🗂️ Índice {nombre} creado en {tabla} ({columnas}).")
+
+
+MIGRACIONES: List[Migracion] = [
+    Migracion(1, "Esquema base", [
+        # Tabla practicante (Esquema Simplificado: Solo ID, Nombre Completo, Horas Base)
+        """
+        CREATE TABLE IF NOT EXISTS practicante (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            id_discord BIGINT NOT NULL UNIQUE,
+            nombre_completo VARCHAR(255) NOT NULL,
+            horas_base TIME DEFAULT '00:00:00'
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS estado_asistencia (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            estado VARCHAR(50) NOT NULL UNIQUE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """,
+        _seed_estados,
+        """
+        CREATE TABLE IF NOT EXISTS asistencia (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            practicante_id INT NOT NULL,
+            estado_id INT NOT NULL,
+            fecha DATE NOT NULL,
+            hora_entrada TIME,
+            hora_salida TIME,
+            horas_extra TIME DEFAULT '00:00:00',
+            observaciones TEXT,
+            motivo VARCHAR(255),
+            FOREIGN KEY (practicante_id) REFERENCES practicante(id) ON DELETE CASCADE,
+            FOREIGN KEY (estado_id) REFERENCES estado_asistencia(id),
+            UNIQUE KEY unique_asistencia_dia (practicante_id, fecha)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS asistencia_recuperacion (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            practicante_id INT NOT NULL,
+            fecha_recuperacion DATE NOT NULL,
+            hora_entrada TIME NOT NULL,
+            hora_salida TIME NULL,
+            motivo TEXT NULL,
+            estado VARCHAR(20) DEFAULT 'Pendiente',
+            FOREIGN KEY (practicante_id) REFERENCES practicante(id) ON DELETE CASCADE,
+            UNIQUE KEY unique_recuperacion_dia (practicante_id, fecha_recuperacion)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """,
+        # Reportes diarios enviados
+        """
+        CREATE TABLE IF NOT EXISTS reportes_enviados (
+            fecha DATE PRIMARY KEY,
+            enviado_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS configuracion_servidor (
+            guild_id BIGINT PRIMARY KEY,
+            canal_asistencia_id BIGINT NULL,
+            canal_reportes_id BIGINT NULL,
+            usuarios_mencion_reporte TEXT NULL, -- IDs separados por comas
+            mensaje_bienvenida TEXT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """,
+        # Administradores (Equipo de Desarrollo)
+        """
+        CREATE TABLE IF NOT EXISTS bot_admins (
+            discord_id BIGINT PRIMARY KEY,
+            nombre_referencia VARCHAR(255),
+            rol VARCHAR(100) DEFAULT 'Developer'
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """,
+        _seed_admins,
+    ]),
+    Migracion(2, "asistencia.actualizado_en para el export incremental", [
+        _agregar_actualizado_en,
+    ]),
+    Migracion(3, "Totales materializados por practicante", [
+        """
+        CREATE TABLE IF NOT EXISTS practicante_totales (
+            practicante_id INT PRIMARY KEY,
+            segundos_bot BIGINT NOT NULL DEFAULT 0,
+            sesiones INT NOT NULL DEFAULT 0,
+            ultima_fecha DATE NULL,
+            FOREIGN KEY (practicante_id) REFERENCES practicante(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """,
+        _reconstruir_totales,
+    ]),
+    Migracion(4, "Índices secundarios para consultas calientes", [
+        _crear_indices,
+    ]),
+    Migracion(5, "Vistas reporte_asistencia y resumen_practicantes", [
+        # Vista para Reporte Excel (Incluye Total: Horas Base + Horas Bot)
+        """
+        CREATE OR REPLACE VIEW reporte_asistencia AS
+        SELECT
+            a.id AS Asistencia_ID,
+            p.id_discord AS ID_Discord,
+            p.nombre_completo AS Nombre_Completo,
+            a.fecha AS Fecha,
+            a.hora_entrada AS Entrada,
+            a.hora_salida AS Salida,
+            ea.estado AS Estado,
+            a.actualizado_en AS Actualizado_En,
+
+            -- Horas trabajadas en esta sesión específica
+            TIMEDIFF(a.hora_salida, a.hora_entrada) AS Horas_Sesion,
+
+            -- Horas Base fijas desde Excel
+            p.horas_base AS Horas_Base,
+
+            -- Total Horas Bot (histórico hasta hoy, desde practicante_totales)
+            SEC_TO_TIME(t.segundos_bot) AS Total_Horas_Bot,
+
+            -- GRAN TOTAL (Base + Bot)
+            ADDTIME(
+                IFNULL(p.horas_base, '00:00:00'),
+                SEC_TO_TIME(IFNULL(t.segundos_bot, 0))
+            ) AS Gran_Total_Acumulado
+
+        FROM asistencia a
+        JOIN practicante p ON a.practicante_id = p.id
+        JOIN estado_asistencia ea ON a.estado_id = ea.id
+        LEFT JOIN practicante_totales t ON t.practicante_id = p.id;
+        """,
+        # Vista simplificada para consultas rápidas (Resumen por Practicante)
+        """
+        CREATE OR REPLACE VIEW resumen_practicantes AS
+        SELECT
+            p.id,
+            p.id_discord AS ID_Discord,
+            p.nombre_completo AS Nombre_Completo,
+            p.horas_base AS Horas_Base,
+
+            -- Total Horas Bot (todas las sesiones completadas)
+            SEC_TO_TIME(IFNULL(t.segundos_bot, 0)) AS Horas_Bot,
+            IFNULL(t.sesiones, 0) AS Sesiones,
+            t.ultima_fecha AS Ultima_Fecha,
+
+            -- Gran Total (Base + Bot)
+            ADDTIME(
+                IFNULL(p.horas_base, '00:00:00'),
+                SEC_TO_TIME(IFNULL(t.segundos_bot, 0))
+            ) AS Total_Acumulado
+        FROM practicante p
+        LEFT JOIN practicante_totales t ON t.practicante_id = p.id
+        ORDER BY Total_Acumulado DESC;
+        """,
+    ]),
+    Migracion(6, "Estado persistente del bot (clave/valor)", [
+        """
+        CREATE TABLE IF NOT EXISTS bot_estado (
+            clave VARCHAR(100) PRIMARY KEY,
+            valor TEXT NOT NULL,
+            actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """,
+    ]),
+]
+
+
+async def version_actual() -> int:
+    """Versión de esquema aplicada (0 si aún no existe schema_version)."""
+    try:
+        fila = await db.fetch_one("SELECT MAX(version) AS version FROM schema_version")
+    except RuntimeError as e:
+        causa = e.__cause__
+        if isinstance(causa, aiomysql.Error) and causa.args and causa.args[0] == ER_NO_SUCH_TABLE:
+            return 0
+        raise
+    return (fila or {}).get('version') or 0
+
+
+async def aplicar_migraciones() -> List[Migracion]:
+    """
+    Aplica las migraciones pendientes en una sola conexión y las registra en schema_version.
+    Retorna las migraciones aplicadas (lista vacía si el esquema ya estaba al día).
+
+    Nota: en MySQL/TiDB el DDL hace commit implícito, así que los pasos son idempotentes
+    (IF NOT EXISTS, INSERT IGNORE, comprobaciones en information_schema) y cada versión
+    se registra al terminar sus pasos; si el arranque se interrumpe, se reintenta sin daño.
+    """
+    version = await version_actual()
+    pendientes = [m for m in MIGRACIONES if m.version > version]
+    if not pendientes:
+        return []
+
+    async with db.get_connection() as conn:
+        try:
+            await conn.begin()
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    descripcion VARCHAR(255) NOT NULL,
+                    aplicada_en DATETIME DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+                """)
+                for migracion in pendientes:
+                    logging.info(f"🧱 Aplicando migración {migracion.version}: {migracion.descripcion}")
+                    for paso in migracion.pasos:
+                        if callable(paso):
+                            await paso(cursor)
+                        else:
+                            await cursor.execute(paso)
+                    await cursor.execute(
+                        "INSERT INTO schema_version (version, descripcion) VALUES (%s, %s)",
+                        (migracion.version, migracion.descripcion)
+                    )
+            await conn.commit()
+        except aiomysql.Error as e:
+            await conn.rollback()
+            raise RuntimeError(f"Error aplicando migraciones: {e}") from e
+
+    return pendientes
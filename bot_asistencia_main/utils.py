@@ -2,11 +2,85 @@ import database as db
 import discord
 from discord import TextStyle, ui
 import datetime
+import time
+from enum import Enum
+from types import MappingProxyType
 from zoneinfo import ZoneInfo
+from bot.config.settings import Settings
+from bot.config.constants import HORARIO_ENTRADA_INICIO, HORARIO_RECUPERACION_FIN
+from bot.core.utils.cache import TTLCache
+from bot.core.metrics import metrics
 
 # Zona horaria de Perú
 LIMA_TZ = ZoneInfo("America/Lima")
 
+# Caché id_discord -> practicante.id (lo llena sync_practicantes_to_db y lo invalida eliminar_practicante)
+practicante_cache: TTLCache[int, int] = TTLCache(
+    maxsize=Settings.PRACTICANTE_CACHE_MAXSIZE,
+    ttl=Settings.PRACTICANTE_CACHE_TTL
+)
+metrics.registrar_cache("practicante", practicante_cache)
+
+def cachear_practicantes(pares):
+    """Carga en bloque pares (id_discord, practicante_id) en el caché"""
+    practicante_cache.update((int(discord_id), p_id) for discord_id, p_id in pares)
+
+def invalidar_practicante(discord_id):
+    """Quita a un practicante del caché (p. ej. tras eliminarlo)"""
+    practicante_cache.invalidate(int(discord_id))
+
+class CambiosPendientes:
+    """
+    Marcas de asistencia modificada desde el último export a Sheets.
+    Lo marcan los caminos de escritura y lo consume el exportador, que espera a que
+    las marcas se calmen (debounce) sin dejar que la más antigua envejezca demasiado.
+    Solo decide cuándo exportar: el detallado ya es incremental por actualizado_en.
+    """
+
+    def __init__(self):
+        self.marcas = 0
+        self.primera_marca = None
+        self.ultima_marca = None
+
+    def __bool__(self):
+        return self.primera_marca is not None
+
+    def marcar(self):
+        ahora = time.monotonic()
+        self.marcas += 1
+        if self.primera_marca is None:
+            self.primera_marca = ahora
+        self.ultima_marca = ahora
+
+    def listo(self, debounce, max_antiguedad, ahora=None):
+        """True si hay cambios y ya pasó el debounce o la marca más antigua superó max_antiguedad"""
+        if not self:
+            return False
+        ahora = ahora if ahora is not None else time.monotonic()
+        return ahora - self.ultima_marca >= debounce or ahora - self.primera_marca >= max_antiguedad
+
+    def tomar(self):
+        """Retorna (marcas, primera_marca) y deja el registro vacío"""
+        tomado = (self.marcas, self.primera_marca)
+        self.marcas = 0
+        self.primera_marca = self.ultima_marca = None
+        return tomado
+
+    def devolver(self, tomado):
+        """Reincorpora cambios tomados cuyo export no se completó (conserva su antigüedad)"""
+        marcas, primera_marca = tomado
+        self.marcas += marcas
+        if primera_marca is not None:
+            self.primera_marca = min(primera_marca, self.primera_marca or primera_marca)
+            self.ultima_marca = self.ultima_marca or primera_marca
+
+# Cambios de asistencia aún no exportados a Google Sheets
+cambios_sheets = CambiosPendientes()
+
+def marcar_cambio_asistencia():
+    """Marca la asistencia como pendiente de exportar a Sheets"""
+    cambios_sheets.marcar()
+
 async def es_admin_bot(discord_id: int) -> bool:
     """Verifica si un usuario es administrador/developer del bot en la BD"""
     query = "SELECT 1 FROM bot_admins WHERE discord_id = %s"
@@ -58,6 +132,11 @@ def format_timedelta_total(td_val):
             return td_str
     return td_str
 
+def en_horario_laboral() -> bool:
+    """Lunes a sábado, entre la apertura de entradas y el cierre de recuperaciones (hora de Lima)"""
+    ahora = datetime.datetime.now(LIMA_TZ)
+    return ahora.weekday() != 6 and HORARIO_ENTRADA_INICIO <= ahora.time() <= HORARIO_RECUPERACION_FIN
+
 def es_domingo() -> bool:
     """Verifica si hoy es domingo en hora de Perú"""
     return datetime.datetime.now(LIMA_TZ).weekday() == 6
@@ -65,68 +144,190 @@ def es_domingo() -> bool:
 
 async def obtener_practicante(interaction, discord_id):
     import logging
-    nombre_usuario = interaction.user.mention
+    practicante_id = practicante_cache.get(int(discord_id))
+    if practicante_id is not None:
+        return practicante_id
+
     logging.info(f"🔍 Buscando practicante en BD para: {interaction.user} (ID: {discord_id})")
     query_practicante = "SELECT id FROM practicante WHERE id_discord = %s"
     practicante = await db.fetch_one(query_practicante, (discord_id,))
     
     # Si no se encuentra el practicante, informar al usuario
     if not practicante:
-        from bot.config.constants import LINK_FORMULARIO_REGISTRO
-        
-        msg = (
-            f"🚫 {nombre_usuario}, no estás registrado en el sistema.\n"
-            f"📝 **Regístrate aquí:** [Formulario de Registro]({LINK_FORMULARIO_REGISTRO})\n"
-            "Una vez registrado, intenta marcar asistencia nuevamente."
-        )
-        if interaction.response.is_done():
-            await interaction.followup.send(msg, ephemeral=True)
-        else:
-            await interaction.response.send_message(msg, ephemeral=True)
+        await enviar_no_registrado(interaction)
         return None
+    practicante_cache.set(int(discord_id), practicante['id'])
     return practicante['id']
 
-async def verificar_entrada(practicante_id, fecha_actual):
-    query_asistencia_existente = "SELECT id FROM asistencia WHERE practicante_id = %s AND fecha = %s"
-    asistencia_existente = await db.fetch_one(query_asistencia_existente, (practicante_id, fecha_actual))
-    return asistencia_existente
+async def enviar_no_registrado(interaction):
+    """Informa al usuario que no está registrado y le envía el formulario"""
+    from bot.config.constants import LINK_FORMULARIO_REGISTRO
+
+    msg = (
+        f"🚫 {interaction.user.mention}, no estás registrado en el sistema.\n"
+        f"📝 **Regístrate aquí:** [Formulario de Registro]({LINK_FORMULARIO_REGISTRO})\n"
+        "Una vez registrado, intenta marcar asistencia nuevamente."
+    )
+    if interaction.response.is_done():
+        await interaction.followup.send(msg, ephemeral=True)
+    else:
+        await interaction.response.send_message(msg, ephemeral=True)
+
+class ResultadoEntrada(Enum):
+    """Resultado de registrar_entrada"""
+    CREADA = "creada"
+    DUPLICADA = "duplicada"
+    NO_REGISTRADO = "no_registrado"
+
+async def registrar_entrada(discord_id, fecha, hora, estado_id) -> ResultadoEntrada:
+    """
+    Registra la entrada en una sola transacción.
+    El INSERT ... SELECT resuelve el practicante y unique_asistencia_dia detecta
+    la entrada duplicada, sin leer antes de escribir. practicante_totales se
+    actualiza en la misma transacción.
+    """
+    query = """
+    INSERT INTO asistencia (practicante_id, fecha, hora_entrada, estado_id)
+    SELECT p.id, %s, %s, %s FROM practicante p WHERE p.id_discord = %s
+    """
+    try:
+        filas = await db.execute_batch([
+            (query, (fecha, hora, estado_id, discord_id)),
+            (db.sql_recalcular_totales("p.id_discord = %s"), (discord_id,)),
+        ])
+    except db.DuplicateEntryError:
+        return ResultadoEntrada.DUPLICADA
+
+    if not filas[0]:
+        invalidar_practicante(discord_id)
+        return ResultadoEntrada.NO_REGISTRADO
+    marcar_cambio_asistencia()
+    return ResultadoEntrada.CREADA
+
+class CatalogoEstados:
+    """Mapa inmutable nombre <-> id de estado_asistencia (sin distinguir mayúsculas)"""
+
+    def __init__(self, filas=()):
+        self._por_nombre = MappingProxyType({f['estado'].strip().casefold(): f['id'] for f in filas})
+        self._por_id = MappingProxyType({f['id']: f['estado'] for f in filas})
+
+    def id_de(self, nombre):
+        if not nombre:
+            return None
+        return self._por_nombre.get(nombre.strip().casefold())
+
+    def nombre_de(self, estado_id):
+        return self._por_id.get(estado_id)
+
+    def __len__(self):
+        return len(self._por_id)
+
+# Se carga en ensure_db_setup; la tabla casi nunca cambia
+estados_asistencia = CatalogoEstados()
+
+async def recargar_estados_asistencia():
+    """Vuelve a leer estado_asistencia y reemplaza el catálogo en memoria"""
+    global estados_asistencia
+    filas = await db.fetch_all("SELECT id, estado FROM estado_asistencia")
+    estados_asistencia = CatalogoEstados(filas)
+    return estados_asistencia
 
 async def obtener_estado_asistencia(estado_nombre):
-    query_estado = "SELECT id FROM estado_asistencia WHERE estado = %s"
-    estado = await db.fetch_one(query_estado, (estado_nombre,))
-    return estado['id'] if estado else None
+    if not estados_asistencia:
+        await recargar_estados_asistencia()
+    return estados_asistencia.id_de(estado_nombre)
+
+async def registrar_salida(practicante_id, fecha, hora, hora_limite) -> bool:
+    """
+    Registra la salida con un único UPDATE condicional.
+    Si la hora supera hora_limite, la salida queda topada y el exceso se guarda
+    en horas_extra (Anti-Farming). Retorna True solo si la salida era nueva.
+    practicante_totales se recalcula en la misma transacción.
+    """
+    query = """
+    UPDATE asistencia
+    SET horas_extra = IF(TIME(%(hora)s) > TIME(%(limite)s), TIMEDIFF(%(hora)s, %(limite)s), '00:00:00'),
+        hora_salida = IF(TIME(%(hora)s) > TIME(%(limite)s), %(limite)s, %(hora)s)
+    WHERE practicante_id = %(practicante_id)s AND fecha = %(fecha)s AND hora_salida IS NULL
+    """
+    filas = await db.execute_batch([
+        (query, {
+            'hora': hora,
+            'limite': hora_limite,
+            'practicante_id': practicante_id,
+            'fecha': fecha,
+        }),
+        (db.sql_recalcular_totales("p.id = %s"), (practicante_id,)),
+    ])
+    if filas[0] == 1:
+        marcar_cambio_asistencia()
+        return True
+    return False
+
+# Lista global de canales de emergencia/oficiales (Siempre permitidos)
+CANALES_OFICIALES = frozenset({
+    1468308523539628208, # Canal Principal Asistencia (Nuevo)
+    1457747478592884878, # Canal Principal Asistencia (Viejo)
+    1457802290093228093  # Canal de Tests
+})
+
+class IndiceCanales:
+    """
+    Índice inmutable guild_id -> frozenset de canales permitidos, para que
+    canal_permitido sea una búsqueda en memoria. CANALES_OFICIALES siempre se
+    permiten; el canal de configuracion_servidor reemplaza a los estáticos
+    (Settings.CANALES_PERMITIDOS y bot.canales_permitidos), que solo se usan
+    en servidores sin canal configurado.
+    """
+
+    def __init__(self, configs=(), canales_estaticos=None):
+        self.configs = MappingProxyType({c['guild_id']: dict(c) for c in configs})
+        guilds = set(self.configs) | set(Settings.CANALES_PERMITIDOS) | set(canales_estaticos or {})
+        self._canales = MappingProxyType({
+            guild_id: frozenset(CANALES_OFICIALES | self._propios(guild_id, canales_estaticos or {}))
+            for guild_id in guilds
+        })
+        self.cargado = bool(configs) or canales_estaticos is not None
+
+    def _propios(self, guild_id, canales_estaticos):
+        canal_configurado = self.canal_configurado(guild_id)
+        if canal_configurado:
+            return {canal_configurado}
+        return set(Settings.CANALES_PERMITIDOS.get(guild_id, [])) | set(canales_estaticos.get(guild_id, []))
+
+    def canal_configurado(self, guild_id):
+        config = self.configs.get(guild_id)
+        return config['canal_asistencia_id'] if config else None
+
+    def permitidos(self, guild_id):
+        return self._canales.get(guild_id, CANALES_OFICIALES)
+
+# Se recarga periódicamente desde bot.py y tras cada escritura de /admin
+indice_canales = IndiceCanales()
+
+async def recargar_config_servidores(bot) -> IndiceCanales:
+    """Lee configuracion_servidor y reconstruye el índice de canales permitidos"""
+    global indice_canales
+    configs = await db.fetch_all("SELECT * FROM configuracion_servidor")
+    indice_canales = IndiceCanales(configs, getattr(bot, 'canales_permitidos', {}))
+    return indice_canales
 
 async def get_server_config(guild_id: int):
-    """Obtiene la configuración dinámica de un servidor desde la BD"""
-    query = "SELECT * FROM configuracion_servidor WHERE guild_id = %s"
-    return await db.fetch_one(query, (guild_id,))
+    """Obtiene la configuración dinámica de un servidor (desde el caché)"""
+    return indice_canales.configs.get(guild_id)
 
 async def canal_permitido(interaction: discord.Interaction) -> bool:
     servidor_id = interaction.guild.id
     canal_id = interaction.channel.id
-    
-    # 1. Lista global de canales de emergencia/oficiales (Siempre permitidos)
-    canales_oficiales = [
-        1468308523539628208, # Canal Principal Asistencia (Nuevo)
-        1457747478592884878, # Canal Principal Asistencia (Viejo)
-        1457802290093228093  # Canal de Tests
-    ]
-    if canal_id in canales_oficiales:
+
+    # Primera llamada antes de que el caché esté listo: cargarlo una vez
+    if not indice_canales.cargado:
+        await recargar_config_servidores(interaction.client)
+
+    if canal_id in indice_canales.permitidos(servidor_id):
         return True
 
-    # 2. Consultar BD para configuración personalizada del servidor
-    config = await get_server_config(servidor_id)
-    canal_configurado = config['canal_asistencia_id'] if config else None
-    
-    if canal_configurado:
-        if canal_id == canal_configurado:
-            return True
-    else:
-        # 3. Fallback a configuración estática de bot.py (si existe)
-        bot = interaction.client
-        canales_estaticos = bot.canales_permitidos.get(servidor_id, [])
-        if canal_id in canales_estaticos:
-            return True
+    canal_configurado = indice_canales.canal_configurado(servidor_id)
 
     # Si llegamos aquí, el canal no está permitido
     import logging